@@ -1,14 +1,37 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from oauthlib.oauth2 import LegacyApplicationClient
+from oauthlib.oauth2.rfc6749.errors import OAuth2Error
+from requests.auth import HTTPBasicAuth
+from requests.exceptions import HTTPError, RequestException
 from requests_oauthlib import OAuth2Session
+import functools
+import threading
+import time
 import urllib
 
-from . import utils
+from . import exports, jsonlib, streaming, utils
+from .cache import CacheEntry, DEFAULT_CACHE_TTLS, cache_key, compile_end_point_templates
+from .models import END_POINT_MODELS, ExportRecord, to_models
+from .upload import MultipartFileStream
+from .variants import VariantTable, variant_filter
+from .export_scheduler import ExportScheduler
+from .token_cache import MemoryTokenCache, token_cache_key, token_is_valid
+from .transport import KeepAliveHTTPAdapter, RetryPolicy
 
 
 class AlissaInterpret(object):
     "Alissa Interpret Public Api Client interface"
 
-    def __init__(self, base_uri, client_id, client_secret, username, password):
+    # Query parameters used to page through listings.
+    page_parameter = 'page'
+    page_size_parameter = 'pageSize'
+    first_page = 0
+
+    def __init__(
+        self, base_uri, client_id, client_secret, username, password, token_cache=None, token_refresh_margin=60,
+        retry_policy=None, timeout=(10, 300), pool_connections=10, pool_maxsize=10, pool_block=False, cache=None,
+        cache_ttls=None, metrics=None, json_backend=None, models=False
+    ):
         """Construct a new Alissa Interpret Public Api Client interface
 
         :param base_uri: Base uri for the Alissa server
@@ -16,49 +39,417 @@ class AlissaInterpret(object):
         :param client_secret: client secret received from Agilent
         :param username: account name of the Alissa user account
         :param password: account password of Alissa the user account
+        :param token_cache: Optional token cache (MemoryTokenCache or FileTokenCache) to reuse tokens between clients
+        :param token_refresh_margin: Refresh the token when it expires within this number of seconds
+        :param retry_policy: Optional RetryPolicy for transient errors, use RetryPolicy(total=0) to disable retries
+        :param timeout: Request timeout in seconds, either a single value or a (connect, read) tuple
+        :param pool_connections: Number of connection pools to cache, one pool per host
+        :param pool_maxsize: Maximum number of connections kept alive per host, set to at least the number of threads
+        :param pool_block: Block when no free connection is available instead of opening a connection that is discarded
+        :param cache: Optional response cache (MemoryResponseCache or SQLiteResponseCache) for read end points
+        :param cache_ttls: Optional dict mapping end point templates, for example 'patients/{id}', to a time to live
+                           in seconds. Only these end points are cached, defaults to DEFAULT_CACHE_TTLS.
+        :param metrics: Optional Metrics collecting request counts, latencies, bytes, retries, polls and token requests
+        :param json_backend: Optional JSON backend used to decode responses, orjson, ujson or json.
+                             Defaults to the fastest installed backend.
+        :param models: Return typed models (Analysis, Patient, LabResult, DataFile and ExportRecord) instead of dicts
         """
         self.base_uri = base_uri
-
-        # Authenticate with OAuth2 and create a new session
-        # ToDo: Add token caching to reuse token between sessions.
+        self.token_refresh_margin = token_refresh_margin
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timeout = timeout
+        self.cache = cache
+        self.metrics = metrics
+        self.json_backend = jsonlib.get_backend(json_backend)
+        self.models = models
+        self._end_point_models = compile_end_point_templates(END_POINT_MODELS) if models else []
+        self._cache_namespace = token_cache_key(base_uri, client_id, username)[:16]  # Separate servers and accounts
+        self._cache_ttls = compile_end_point_templates(cache_ttls if cache_ttls is not None else DEFAULT_CACHE_TTLS)
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._username = username
+        self._password = password
+        self._token_url = f'{self.base_uri}/auth/oauth/token'
+        self._token_cache = token_cache if token_cache is not None else MemoryTokenCache()
+        self._token_cache_key = token_cache_key(base_uri, client_id, username)
+        self._token_lock = threading.Lock()
+        self._in_flight = {}  # end point: Future of a get request shared by concurrent callers
+        self._in_flight_lock = threading.Lock()
+
+        # Authenticate with OAuth2 and create a new session, reuse a cached token if available.
         self.session = OAuth2Session(client=LegacyApplicationClient(client_id=client_id))
-        self.session.fetch_token(
-            token_url=f'{self.base_uri}/auth/oauth/token',
-            username=username, password=password,
-            client_id=client_id, client_secret=client_secret
+        adapter = KeepAliveHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._ensure_token()
+
+    def _ensure_token(self, force=False):
+        """
+        Make sure the session holds a token that does not expire within token_refresh_margin seconds.
+
+        :param force: Replace the current session token, for example when the server rejected it.
+        """
+        if not force and token_is_valid(self.session.token, self.token_refresh_margin):
+            return
+
+        rejected_token = self.session.token if force else None
+        with self._token_lock, self._token_cache.lock(self._token_cache_key):
+            # Another client or process may have fetched a new token while waiting for the lock.
+            token = self._token_cache.get(self._token_cache_key)
+            if token_is_valid(token, self.token_refresh_margin) and (
+                not rejected_token or token['access_token'] != rejected_token.get('access_token')
+            ):
+                self.session.token = token
+                return
+
+            token = self._refresh_token(token or self.session.token) or self._fetch_token()
+            self._token_cache.set(self._token_cache_key, token)
+
+    def _fetch_token(self):
+        """Fetch a new token using the password grant."""
+        start_time, start = time.time(), time.monotonic()
+        token = None
+        try:
+            token = self.session.fetch_token(
+                token_url=self._token_url,
+                username=self._username, password=self._password,
+                client_id=self._client_id, client_secret=self._client_secret, timeout=self.timeout
+            )
+            return token
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_token('password', start_time, time.monotonic() - start, None if token else 'error')
+
+    def _refresh_token(self, token):
+        """
+        Refresh a token using its refresh token, return None if the token can not be refreshed.
+
+        :param token: OAuth2 token dictionary
+        """
+        if not token or not token.get('refresh_token'):
+            return None
+        start_time, start = time.time(), time.monotonic()
+        error = None
+        try:
+            return self.session.refresh_token(
+                self._token_url, refresh_token=token['refresh_token'],
+                auth=HTTPBasicAuth(self._client_id, self._client_secret), timeout=self.timeout
+            )
+        except (OAuth2Error, RequestException) as exception:
+            error = type(exception).__name__
+            return None
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_token('refresh_token', start_time, time.monotonic() - start, error)
+
+    def _record_request(self, method, end_point, response, start_time, start, stream):
+        """Record a request in the metrics, streamed response bodies are counted by Content-Length."""
+        duration = time.monotonic() - start
+        if response is None:
+            self.metrics.record_request(method, end_point, None, start_time, duration)
+            return
+        bytes_sent = int(response.request.headers.get('Content-Length') or 0)
+        if stream:
+            bytes_received = int(response.headers.get('Content-Length') or 0)
+        else:
+            bytes_received = len(response.content)
+        self.metrics.record_request(
+            method, end_point, response.status_code, start_time, duration, bytes_sent, bytes_received
         )
 
+    def _request(self, method, end_point, **kwargs):
+        """
+        Send a request to the end_point, combining base_uri, api uri and end_point. Return the response.
+        An expired or rejected token is replaced and the request is retried once,
+        transient errors are retried according to the retry policy.
+
+        :param method: HTTP method
+        :param end_point: end point to send the request to
+        """
+        uri = f'{self.base_uri}/interpret/api/2/{end_point}'
+        kwargs.setdefault('timeout', self.timeout)
+        token_renewed = False
+        attempt = 0
+        while True:
+            self._ensure_token()
+            start_time, start = time.time(), time.monotonic()
+            try:
+                response = self.session.request(method, uri, **kwargs)
+            except RequestException as error:
+                if self.metrics is not None:
+                    self._record_request(method, end_point, None, start_time, start, kwargs.get('stream'))
+                if attempt >= self.retry_policy.total or not self.retry_policy.is_retryable_error(method, error):
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                attempt += 1
+                retry_reason = type(error).__name__
+            else:
+                if self.metrics is not None:
+                    self._record_request(method, end_point, response, start_time, start, kwargs.get('stream'))
+                if response.status_code == 401 and not token_renewed:
+                    self._ensure_token(force=True)
+                    token_renewed = True
+                    delay = 0
+                elif attempt < self.retry_policy.total and self.retry_policy.is_retryable_status(
+                    method, response.status_code
+                ):
+                    delay = self.retry_policy.backoff(attempt, response.headers.get('Retry-After'))
+                    attempt += 1
+                else:
+                    response.raise_for_status()  # Raise exception on request error
+                    return response
+                retry_reason = response.status_code
+                response.close()
+
+            if self.metrics is not None:
+                self.metrics.record_retry(method, end_point, retry_reason)
+
+            time.sleep(delay)
+            utils.rewind_body(kwargs.get('data'), kwargs.get('files'))
+
+    def _cache_ttl(self, end_point):
+        """Return the cache time to live of an end point, or None if the end point is not cached."""
+        for pattern, ttl in self._cache_ttls:
+            if pattern.match(end_point):
+                return ttl
+        return None
+
+    def _decode(self, end_point, content):
+        """
+        Decode a JSON response body with the JSON backend, wrapped in a model when models are enabled.
+
+        :param end_point: end point of the response, used to select the model class
+        :param content: response body
+        """
+        data = self.json_backend.loads(content)
+        for pattern, model_class in self._end_point_models:
+            if pattern.match(end_point):
+                return to_models(model_class, data)
+        return data
+
+    def _export_records(self, variants):
+        """Wrap exported variants in ExportRecord models when models are enabled."""
+        return map(ExportRecord, variants) if self.models else variants
+
     def _get(self, end_point, params=None, **kwargs):
         """
         Get data from the end_point, combining base_uri, api uri and end_point. Return the response as decoded json
+        Responses of cached end points are reused while fresh and revalidated with the server when expired.
 
         :param end_point: end point to get data from
         :param params: Optional params dict
 
         """
-        uri = f'{self.base_uri}/interpret/api/2/{end_point}'
-        response = self.session.get(uri, params=params, **kwargs)
-        response.raise_for_status()  # Raise exception on request error
-        return response.json()
+        ttl = self._cache_ttl(end_point) if self.cache is not None and not kwargs else None
+        if ttl is None:
+            return self._decode(end_point, self._request('GET', end_point, params=params, **kwargs).content)
+
+        key = cache_key(f'{self._cache_namespace}/{end_point}', params)
+        entry = self.cache.get(key)
+        if entry and time.time() - entry.stored_at < ttl:
+            return self._decode(end_point, entry.content)
+
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        response = self._request('GET', end_point, params=params, headers=headers)
+
+        if response.status_code == 304 and entry:  # Not modified
+            content = entry.content
+        else:
+            content = response.content
+        self.cache.set(key, CacheEntry(
+            content,
+            response.headers.get('ETag', entry.etag if entry else None),
+            response.headers.get('Last-Modified', entry.last_modified if entry else None),
+            time.time()
+        ))
+        return self._decode(end_point, content)
 
     def _post(self, end_point, data=None, json=None, **kwargs):
         """
         Post data to the end_point, combining base_uri, api uri and end_point. Return the response as decoded json
+        Cached responses of the end_point and its parent resource are invalidated.
 
         :param end_point: end point to post data to
         :param data: Optional dictionary, list of tuples, bytes, or file-like object
         :param json: Optional json data
         """
-        uri = f'{self.base_uri}/interpret/api/2/{end_point}'
-        response = self.session.post(uri, data, json, **kwargs)
-        response.raise_for_status()  # Raise exception on request error
-        return response.json()
+        response = self._request('POST', end_point, data=data, json=json, **kwargs)
+        if self.cache is not None:
+            self.cache.invalidate(f'{self._cache_namespace}/{end_point}')
+            if '/' in end_point:
+                self.cache.invalidate(f'{self._cache_namespace}/{end_point.rsplit("/", 1)[0]}')
+        return self._decode(end_point, response.content)
+
+    def _get_coalesced(self, end_point):
+        """
+        Get data from the end_point, concurrent calls for the same end_point share a single request and its result.
+
+        :param end_point: end point to get data from
+        """
+        with self._in_flight_lock:
+            future = self._in_flight.get(end_point)
+            owner = future is None
+            if owner:
+                future = self._in_flight[end_point] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._get(end_point)
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[end_point]
+
+    def _get_many(self, end_points, max_workers, return_exceptions):
+        """
+        Get data from many end points concurrently, return the results in the order of end_points.
+        Duplicate end points and end points requested concurrently by other callers are requested once and share the
+        same result object.
+
+        :param end_points: end points to get data from
+        :param max_workers: Maximum number of concurrent requests
+        :param return_exceptions: Return exceptions in place of the results instead of raising the first exception
+        """
+        end_points = list(end_points)
+        unique_end_points = list(dict.fromkeys(end_points))
+        if not unique_end_points:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_end_points))) as executor:
+            futures = {end_point: executor.submit(self._get_coalesced, end_point) for end_point in unique_end_points}
+
+        results = []
+        for end_point in end_points:
+            error = futures[end_point].exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else futures[end_point].result())
+        return results
+
+    def _iter_pages(self, end_point, params, page_size, prefetch=True):
+        """
+        Lazily page through a listing end point and yield the items one by one.
+        The next page is requested in the background while the current page is consumed.
+
+        :param end_point: listing end point
+        :param params: params dict used to filter the listing
+        :param page_size: Number of items per page
+        :param prefetch: Request the next page in the background
+        """
+        def get_page(page):
+            return self._get(end_point, dict(params, **{self.page_parameter: page, self.page_size_parameter: page_size}))
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = self.first_page
+            items = get_page(page)
+            previous_first_item = None
+            while items:
+                # Stop when the server ignores paging and returns the complete listing for every page.
+                if items[0] == previous_first_item:
+                    break
+                next_items = None
+                if len(items) == page_size and executor:
+                    next_items = executor.submit(get_page, page + 1)
+
+                for item in items:
+                    yield item
+
+                if len(items) != page_size:
+                    break
+                previous_first_item = items[0]
+                page += 1
+                items = next_items.result() if next_items else get_page(page)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def _iter_json_array(self, response, chunk_size=65536):
+        """
+        Yield the items of a JSON array response one by one while the response body is streamed.
+
+        :param response: response requested with stream=True
+        :param chunk_size: Number of bytes read per chunk
+        """
+        try:
+            for item in streaming.iter_json_array(response.iter_content(chunk_size)):
+                yield item
+        finally:
+            response.close()
+
+    def _poll_export(self, end_point, poll_schedule=None, **kwargs):
+        """
+        Get an export from the end_point. Return the response, or None if the export is not ready yet.
+        Not found statuses are only treated as not ready for the first max_not_found_polls polls of poll_schedule.
+
+        :param end_point: export end point
+        :param poll_schedule: Optional PollSchedule of the export, without poll schedule not found statuses are raised
+        """
+        try:
+            response = self._request('GET', end_point, **kwargs)
+        except HTTPError as error:
+            status_code = error.response.status_code if error.response is not None else None
+            if status_code in exports.EXPORT_NOT_READY_STATUS_CODES:
+                response = None
+            elif status_code in exports.EXPORT_NOT_FOUND_STATUS_CODES and poll_schedule and poll_schedule.not_found():
+                response = None
+            else:
+                raise
+        else:
+            if response.status_code in exports.EXPORT_NOT_READY_STATUS_CODES:
+                response.close()
+                response = None
+        if self.metrics is not None:
+            self.metrics.record_poll(end_point, response is not None)
+        return response
+
+    def _wait_for_export(self, end_point, poll_schedule, **kwargs):
+        """
+        Poll an export until it is ready and return the response.
+
+        :param end_point: export end point
+        :param poll_schedule: PollSchedule used to wait between polls
+        """
+        start_time, start = time.time(), time.monotonic()
+        error = None
+        try:
+            while True:
+                time.sleep(poll_schedule.next_delay())
+                response = self._poll_export(end_point, poll_schedule, **kwargs)
+                if response is not None:
+                    return response
+        except Exception as exception:
+            error = type(exception).__name__
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_export(end_point, start_time, time.monotonic() - start, error)
 
     def get_analyses(self, **kwargs):
         """Get all analyses. When kwargs are provided the result is limited to the analyses matching the criteria."""
         params = utils.kwargs_to_dict(**kwargs)
         return self._get('analyses', params)
 
+    def iter_analyses(self, page_size=100, prefetch=True, **kwargs):
+        """
+        Lazily iterate over all analyses page by page. When kwargs are provided the result is limited to the analyses
+        matching the criteria.
+
+        :param page_size: Number of analyses requested per page
+        :param prefetch: Request the next page in the background while the current page is consumed
+        """
+        params = utils.kwargs_to_dict(**kwargs)
+        return self._iter_pages('analyses', params, page_size, prefetch)
+
     def get_analysis(self, id):
         """
         Get an analysis via id.
@@ -67,6 +458,25 @@ class AlissaInterpret(object):
         """
         return self._get(f'analyses/{id}')
 
+    def get_analyses_by_ids(self, ids, analysis_type=None, max_workers=8, return_exceptions=False):
+        """
+        Get analyses via ids concurrently, return the analyses in the order of ids.
+        Duplicate ids, and ids requested concurrently by other calls, are requested once and share the same result.
+        Use a pool_maxsize of at least max_workers to reuse all connections.
+
+        :param ids: analysis ids
+        :param analysis_type: Optional analysis type, PATIENT or INHERITANCE, to get patient or inheritance analyses
+        :param max_workers: Maximum number of concurrent requests
+        :param return_exceptions: Return exceptions in place of the analyses instead of raising the first exception
+        """
+        if analysis_type is None:
+            end_point = 'analyses'
+        elif analysis_type in exports.ANALYSIS_TYPE_END_POINTS:
+            end_point = exports.ANALYSIS_TYPE_END_POINTS[analysis_type]
+        else:
+            raise ValueError(f'Unknown analysis type: {analysis_type}')
+        return self._get_many([f'{end_point}/{id}' for id in ids], max_workers, return_exceptions)
+
     def get_analysis_sources(self, id):
         """
         Get all sources used in an analysis.
@@ -88,6 +498,17 @@ class AlissaInterpret(object):
         params = utils.kwargs_to_dict(**kwargs)
         return self._get('data_files', params)
 
+    def iter_data_files(self, page_size=100, prefetch=True, **kwargs):
+        """
+        Lazily iterate over all data files page by page. When kwargs are provided the result is limited to the data files
+        matching the criteria.
+
+        :param page_size: Number of data files requested per page
+        :param prefetch: Request the next page in the background while the current page is consumed
+        """
+        params = utils.kwargs_to_dict(**kwargs)
+        return self._iter_pages('data_files', params, page_size, prefetch)
+
     def get_data_file(self, id):
         """
         Get an data file via id.
@@ -96,17 +517,45 @@ class AlissaInterpret(object):
         """
         return self._get(f'data_files/{id}')
 
-    def post_data_file(self, file, type):
+    def post_data_file(self, file, type, progress=None):
         """
-        Upload a new file.
+        Upload a new file. The file is streamed from disk in binary chunks, gzip compressed files are uploaded as is.
 
         :param file: path to file
         :param type: The type of the data file. This type is used to select the correct file parser.
                      In order to use the default VCF parser the value ‘VCF_FILE’ should be provided.
+        :param progress: Optional callback called with (bytes_send, total_bytes, elapsed_seconds) while uploading
         """
-        files = {'file': open(file, 'r')}
         params = urllib.parse.urlencode({'type': type}, quote_via=urllib.parse.quote)
-        return self._post('data_files', files=files, params=params)
+        with MultipartFileStream(file, progress=progress) as body:
+            return self._post('data_files', data=body, params=params, headers={'Content-Type': body.content_type})
+
+    def post_data_files(self, files, type, workers=4, progress=None, return_exceptions=False):
+        """
+        Upload multiple files concurrently over the shared session. Return the uploaded data files in input order.
+        Use a pool_maxsize of at least workers to reuse all connections.
+
+        :param files: paths to files
+        :param type: The type of the data files, for example ‘VCF_FILE’.
+        :param workers: Number of concurrent uploads
+        :param progress: Optional callback called with (file, bytes_send, total_bytes, elapsed_seconds) while uploading
+        :param return_exceptions: Return exceptions in place of the data files instead of raising the first exception,
+                                  the other uploads are completed either way
+        """
+        def post_data_file(file):
+            file_progress = functools.partial(progress, file) if progress else None
+            return self.post_data_file(file, type, progress=file_progress)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(post_data_file, file) for file in files]
+
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
 
     def get_inheritance_analyses(self, analysis_id):
         """
@@ -178,6 +627,17 @@ class AlissaInterpret(object):
         """
         return self._get(f'lab_results/{id}')
 
+    def get_lab_results_by_ids(self, ids, max_workers=8, return_exceptions=False):
+        """
+        Get lab results via ids concurrently, return the lab results in the order of ids.
+        Duplicate ids, and ids requested concurrently by other calls, are requested once and share the same result.
+
+        :param ids: lab result ids
+        :param max_workers: Maximum number of concurrent requests
+        :param return_exceptions: Return exceptions in place of the lab results instead of raising the first exception
+        """
+        return self._get_many([f'lab_results/{id}' for id in ids], max_workers, return_exceptions)
+
     def post_lab_result(self, patient_id, data_file_id, sample):
         """
         Create a new lab result.
@@ -198,6 +658,17 @@ class AlissaInterpret(object):
         params = utils.kwargs_to_dict(**kwargs)
         return self._get('patients', params)
 
+    def iter_patients(self, page_size=100, prefetch=True, **kwargs):
+        """
+        Lazily iterate over all patients page by page. When kwargs are provided the result is limited to the patients
+        matching the criteria.
+
+        :param page_size: Number of patients requested per page
+        :param prefetch: Request the next page in the background while the current page is consumed
+        """
+        params = utils.kwargs_to_dict(**kwargs)
+        return self._iter_pages('patients', params, page_size, prefetch)
+
     def get_patient(self, id):
         """
         Get an patient via id.
@@ -206,6 +677,17 @@ class AlissaInterpret(object):
         """
         return self._get(f'patients/{id}')
 
+    def get_patients_by_ids(self, ids, max_workers=8, return_exceptions=False):
+        """
+        Get patients via ids concurrently, return the patients in the order of ids.
+        Duplicate ids, and ids requested concurrently by other calls, are requested once and share the same result.
+
+        :param ids: patient ids
+        :param max_workers: Maximum number of concurrent requests
+        :param return_exceptions: Return exceptions in place of the patients instead of raising the first exception
+        """
+        return self._get_many([f'patients/{id}' for id in ids], max_workers, return_exceptions)
+
     def post_patient(self, accession_number, family_identifier, gender, folder_name, comments):
         """
         Create a new patient.
@@ -279,3 +761,123 @@ class AlissaInterpret(object):
         :param export_id: export id
         """
         return self._get(f'patient_analyses/{analysis_id}/copy_number_variations/exports/{export_id}')
+
+    def post_variants_export(
+        self, analysis_type, variant_type, analysis_id, marked_review=False, marked_include_report=False, **filters
+    ):
+        """
+        Request an export of all variants from a patient or inheritance analysis via id.
+        When filters are provided they are passed to the server as additional export criteria, converted to camel case.
+        Falsy values such as 0 and False are send, filters set to None are left out.
+        Criteria not supported by the server may be ignored, use the where argument of export_variants to filter
+        reliably.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param marked_review: Filter on marked for review
+        :param marked_include_report: Filter on marked include in report
+        """
+        data = {
+            'markedForReview': marked_review,
+            'markedIncludeInReport': marked_include_report,
+        }
+        data.update({utils.snake_to_camel_case(key): value for key, value in filters.items() if value is not None})
+        return self._post(exports.export_end_point(analysis_type, variant_type, analysis_id), json=data)
+
+    def get_variants_export(self, analysis_type, variant_type, analysis_id, export_id):
+        """
+        Get an requested export of all variants from a patient or inheritance analysis via id.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param export_id: export id
+        """
+        return self._get(exports.export_end_point(analysis_type, variant_type, analysis_id, export_id))
+
+    def iter_variants_export(self, analysis_type, variant_type, analysis_id, export_id):
+        """
+        Stream an requested export of all variants from a patient or inheritance analysis via id.
+        Yield the variants one by one, memory usage is independent of the export size.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param export_id: export id
+        """
+        end_point = exports.export_end_point(analysis_type, variant_type, analysis_id, export_id)
+        return self._export_records(self._iter_json_array(self._request('GET', end_point, stream=True)))
+
+    def export_variants(
+        self, analysis_type, variant_type, analysis_id, marked_review=False, marked_include_report=False,
+        timeout=3600, initial_delay=1, max_delay=30, backoff=1.5, max_not_found_polls=3, stream=False, fields=None,
+        where=None, **filters
+    ):
+        """
+        Export all variants from a patient or inheritance analysis via id.
+        Requests the export and polls with exponential backoff until the export is ready.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param marked_review: Filter on marked for review
+        :param marked_include_report: Filter on marked include in report
+        :param timeout: Seconds to wait for the export, raises ExportTimeoutError when exceeded
+        :param initial_delay: Seconds to wait before the first poll
+        :param max_delay: Maximum seconds between polls
+        :param backoff: Multiplier applied to the delay after every poll
+        :param max_not_found_polls: Number of polls answered with 404 or 409 that are treated as not ready before the
+                                    export fails, None treats them as not ready until the timeout
+        :param stream: Return an iterator yielding the variants while the export is downloaded and parsed,
+                       instead of a list. Use for large exports to keep memory usage flat.
+        :param fields: Optional field names, nested fields separated by dots. Return a compact VariantTable
+                       containing only these fields, built while the export is streamed.
+        :param where: Optional client side filter applied while the export is streamed, either a predicate called with
+                      each variant or a dict of field criteria, see variants.variant_filter.
+        :param filters: Optional server side export criteria, see post_variants_export
+        """
+        poll_schedule = exports.PollSchedule(initial_delay, max_delay, backoff, timeout, max_not_found_polls)
+        export_id = self.post_variants_export(
+            analysis_type, variant_type, analysis_id, marked_review, marked_include_report, **filters
+        )['exportId']
+        end_point = exports.export_end_point(analysis_type, variant_type, analysis_id, export_id)
+        response = self._wait_for_export(end_point, poll_schedule, stream=stream or fields is not None or where is not None)
+        if where is None:
+            variants = self._iter_json_array(response) if stream or fields is not None else None
+        else:
+            # Filtered variants are never held in memory all at once, only the matching variants are kept.
+            predicate = variant_filter(where) if isinstance(where, dict) else where
+            variants = (variant for variant in self._iter_json_array(response) if predicate(variant))
+        if fields is not None:
+            return VariantTable.from_variants(variants, fields)
+        if variants is None:
+            variants = self.json_backend.loads(response.content)
+        variants = self._export_records(variants)
+        return variants if stream else list(variants)
+
+    def export_variants_diff(self, analysis_type, variant_type, analysis_id, snapshot_store, key=None, update=True, **kwargs):
+        """
+        Export variants and compare them with the previous export of the same analysis stored in snapshot_store.
+        Return a VariantDiff with the added and changed variants, the keys of removed variants and the number of
+        unchanged variants. The export is streamed, only changed variants are kept in memory.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param snapshot_store: VariantSnapshotStore containing the content hashes of previous exports
+        :param key: Optional callable returning the identity of a variant, defaults to the id or the content hash
+        :param update: Store this export as the previous export of the analysis
+        :param kwargs: Optional export_variants arguments, for example where, timeout or server side filters
+        """
+        variants = self.export_variants(analysis_type, variant_type, analysis_id, stream=True, **kwargs)
+        return snapshot_store.diff(analysis_type, variant_type, analysis_id, variants, key=key, update=update)
+
+    def export_variants_many(self, jobs, **kwargs):
+        """
+        Export variants of many analyses concurrently, yield an ExportResult (job, variants, error) per completed job.
+
+        :param jobs: Iterable of (analysis_id, analysis_type, variant_type) tuples
+        :param kwargs: Optional ExportScheduler arguments, for example requests_per_second and max_in_flight
+        """
+        return ExportScheduler(self, **kwargs).run(jobs)
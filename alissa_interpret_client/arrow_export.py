@@ -0,0 +1,150 @@
+import itertools
+import json
+import os
+
+FORMATS = ('parquet', 'arrow')
+
+
+def _import_pyarrow():
+    """Import pyarrow, an optional dependency."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            'Writing Parquet or Arrow files requires pyarrow, install it with: pip install alissa_interpret_client[arrow]'
+        )
+    return pyarrow
+
+
+class _FileWriter(object):
+    """Write record batches to a single Parquet or Arrow IPC file."""
+
+    def __init__(self, pyarrow, path, schema, format, compression):
+        self.path = path
+        self._sink = None
+        if format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(path, schema, compression=compression)
+        else:
+            self._sink = pyarrow.OSFile(path, 'wb')
+            self._writer = pyarrow.ipc.new_file(self._sink, schema)
+
+    def write(self, record_batch):
+        self._writer.write_batch(record_batch)
+
+    def close(self):
+        self._writer.close()
+        if self._sink:
+            self._sink.close()
+
+
+def _is_compatible(pyarrow, batch_type, schema_type):
+    """
+    Check whether values inferred as batch_type can be stored as schema_type without losing data.
+    Null values fit any type, integers fit floating point columns and any value fits a text column as JSON.
+    Structs may miss fields of the schema, but may not contain fields missing from the schema.
+    """
+    types = pyarrow.types
+    if batch_type == schema_type or types.is_null(batch_type) or types.is_string(schema_type):
+        return True
+    if types.is_integer(batch_type) and types.is_floating(schema_type):
+        return True
+    if types.is_struct(batch_type) and types.is_struct(schema_type):
+        schema_fields = {schema_type.field(index).name: schema_type.field(index) for index in range(schema_type.num_fields)}
+        for index in range(batch_type.num_fields):
+            field = batch_type.field(index)
+            if field.name not in schema_fields or not _is_compatible(pyarrow, field.type, schema_fields[field.name].type):
+                return False
+        return True
+    if types.is_list(batch_type) and types.is_list(schema_type):
+        return _is_compatible(pyarrow, batch_type.value_type, schema_type.value_type)
+    return False
+
+
+def _check_batch(pyarrow, batch, schema):
+    """Raise ValueError when a batch contains fields or types that do not fit the schema."""
+    for field in pyarrow.Table.from_pylist(batch).schema:
+        index = schema.get_field_index(field.name)
+        if index == -1:
+            raise ValueError(f'Field {field.name} is not in the schema, pass a schema containing all fields')
+        if not _is_compatible(pyarrow, field.type, schema.field(index).type):
+            raise ValueError(
+                f'Field {field.name} has type {field.type}, which does not fit schema type {schema.field(index).type}. '
+                'Pass a schema with the correct type.'
+            )
+
+
+def write_variants(
+    variants, path, format='parquet', batch_size=10000, rows_per_file=None, compression='snappy', schema=None
+):
+    """
+    Write variants to a Parquet or Arrow IPC file while the variants are streamed, return the number of variants written.
+    No file is written when there are no variants. Without schema the schema is inferred from the first batch of
+    variants, fields without values in the first batch are stored as text. Non text values of text fields are stored
+    as JSON. Every batch is checked against the schema, a ValueError is raised for fields missing from the schema and
+    for values that do not fit the type of their field, instead of dropping or truncating values.
+
+    :param variants: Iterable of variant dicts, for example export_variants(..., stream=True)
+    :param path: Output file path, or output directory when rows_per_file is set
+    :param format: parquet or arrow (Arrow IPC file format, memory-mappable)
+    :param batch_size: Number of variants converted and written at once
+    :param rows_per_file: Optional maximum number of variants per file, partitions the output into
+                          part-00000.<format>, part-00001.<format>, ... files in the path directory.
+    :param compression: Parquet compression codec
+    :param schema: Optional pyarrow schema containing all fields, use when fields or types vary between variants
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format: {format}')
+    pyarrow = _import_pyarrow()
+
+    variants = iter(variants)
+    writer = None
+    file_rows = 0
+    file_count = 0
+    total_rows = 0
+    if rows_per_file:
+        os.makedirs(path, exist_ok=True)
+        batch_size = min(batch_size, rows_per_file)
+
+    try:
+        while True:
+            if writer and rows_per_file and file_rows >= rows_per_file:
+                writer.close()
+                writer = None
+            # Never read past the end of the current file, a batch is written to a single file.
+            count = min(batch_size, rows_per_file - file_rows) if writer and rows_per_file else batch_size
+            batch = list(itertools.islice(variants, count))
+            if not batch:
+                break
+
+            # Copy the variants, the variants of the caller are never modified and models are converted to dicts.
+            batch = [dict(variant) for variant in batch]
+            if schema is None:
+                schema = pyarrow.Table.from_pylist(batch).schema
+                for field in schema:
+                    if pyarrow.types.is_null(field.type):
+                        schema = schema.set(schema.get_field_index(field.name), pyarrow.field(field.name, pyarrow.string()))
+            text_fields = [field.name for field in schema if pyarrow.types.is_string(field.type)]
+            for variant in batch:
+                for name in text_fields:
+                    value = variant.get(name)
+                    if value is not None and not isinstance(value, str):
+                        variant[name] = json.dumps(value)
+            _check_batch(pyarrow, batch, schema)
+            record_batch = pyarrow.RecordBatch.from_pylist(batch, schema=schema)
+
+            if writer is None:
+                file_path = os.path.join(path, f'part-{file_count:05d}.{format}') if rows_per_file else path
+                writer = _FileWriter(pyarrow, file_path, schema, format, compression)
+                file_count += 1
+                file_rows = 0
+
+            writer.write(record_batch)
+            file_rows += len(batch)
+            total_rows += len(batch)
+    finally:
+        if writer:
+            writer.close()
+
+    return total_rows
@@ -0,0 +1,121 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
+
+from .alissa_interpret import AlissaInterpret
+
+
+class AsyncAlissaInterpret(object):
+    """
+    Asyncio Alissa Interpret Public Api Client interface, providing the AlissaInterpret endpoint methods and
+    export_variants as coroutines and the iter_ methods as asynchronous iterators.
+    Requests run on a thread pool sharing a single AlissaInterpret client, so connections and tokens are reused.
+    """
+
+    # Number of items of a blocking iterator fetched per thread pool call by iterate.
+    iterate_chunk_size = 1000
+
+    def __init__(
+        self, base_uri=None, client_id=None, client_secret=None, username=None, password=None, max_concurrency=20,
+        client=None, **kwargs
+    ):
+        """Construct a new asyncio Alissa Interpret Public Api Client interface, authenticates immediately.
+
+        :param base_uri: Base uri for the Alissa server
+        :param client_id: client id received from Agilent
+        :param client_secret: client secret received from Agilent
+        :param username: account name of the Alissa user account
+        :param password: account password of Alissa the user account
+        :param max_concurrency: Maximum number of requests in flight
+        :param client: Optional existing AlissaInterpret client, replaces the connection arguments
+        :param kwargs: Optional AlissaInterpret arguments, for example token_cache or retry_policy
+        """
+        if client is None:
+            kwargs.setdefault('pool_maxsize', max_concurrency)
+            client = AlissaInterpret(base_uri, client_id, client_secret, username, password, **kwargs)
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the thread pool and close the connections of the client."""
+        self._executor.shutdown(wait=False)
+        self.client.session.close()
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Run a blocking function on the client thread pool, limited by max_concurrency.
+
+        :param function: Callable, for example a method of the AlissaInterpret client
+        """
+        # Create the semaphore within the running event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def iterate(self, iterator):
+        """
+        Asynchronously iterate over a blocking iterator, items are fetched in chunks on the client thread pool.
+
+        :param iterator: Iterator, for example a streamed export
+        """
+        iterator = iter(iterator)
+        try:
+            while True:
+                items = await self.run(list, itertools.islice(iterator, self.iterate_chunk_size))
+                for item in items:
+                    yield item
+                if len(items) < self.iterate_chunk_size:
+                    return
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    async def export_variants(self, *args, **kwargs):
+        """
+        Export all variants from a patient or inheritance analysis, see AlissaInterpret.export_variants.
+        With stream=True an asynchronous iterator over the streamed variants is returned.
+        """
+        variants = await self.run(self.client.export_variants, *args, **kwargs)
+        return self.iterate(variants) if kwargs.get('stream') else variants
+
+    async def export_variants_diff(self, *args, **kwargs):
+        """Export variants and compare them with the previous export, see AlissaInterpret.export_variants_diff."""
+        return await self.run(self.client.export_variants_diff, *args, **kwargs)
+
+
+def _async_method(name):
+    """Create a coroutine method calling the AlissaInterpret method name on the client thread pool."""
+    @functools.wraps(getattr(AlissaInterpret, name))
+    async def method(self, *args, **kwargs):
+        return await self.run(getattr(self.client, name), *args, **kwargs)
+    return method
+
+
+def _async_iter_method(name):
+    """Create a method returning an asynchronous iterator over the AlissaInterpret iter_ method name."""
+    @functools.wraps(getattr(AlissaInterpret, name))
+    async def method(self, *args, **kwargs):
+        # Some iter_ methods send their first request when called, so the iterator is created on the thread pool.
+        iterator = await self.run(getattr(self.client, name), *args, **kwargs)
+        async for item in self.iterate(iterator):
+            yield item
+    return method
+
+
+# Add all endpoint methods of AlissaInterpret as coroutines and the iter_ methods as asynchronous iterators.
+for _name in dir(AlissaInterpret):
+    if _name.startswith(('get_', 'post_')):
+        setattr(AsyncAlissaInterpret, _name, _async_method(_name))
+    elif _name.startswith('iter_'):
+        setattr(AsyncAlissaInterpret, _name, _async_iter_method(_name))
@@ -0,0 +1,169 @@
+from collections import OrderedDict, namedtuple
+import os
+import re
+import sqlite3
+import threading
+import urllib
+
+# Default time to live in seconds for cached end points, end points not listed are not cached.
+DEFAULT_CACHE_TTLS = {
+    'analyses/{id}': 60,
+    'analyses/{id}/sources': 3600,
+    'patients/{id}': 300,
+    'data_files/{id}': 3600,
+    'lab_results/{id}': 300,
+}
+
+CacheEntry = namedtuple('CacheEntry', ['content', 'etag', 'last_modified', 'stored_at'])
+
+
+def cache_key(end_point, params=None):
+    """
+    Return the cache key for a request.
+
+    :param end_point: end point
+    :param params: Optional params dict
+    """
+    if not params:
+        return end_point
+    return f'{end_point}?{urllib.parse.urlencode(sorted(params.items()))}'
+
+
+def compile_end_point_templates(values):
+    """
+    Compile end point templates to regular expressions, return a list of (pattern, value) tuples.
+
+    :param values: dict mapping end point templates, for example 'patients/{id}', to values
+    """
+    compiled_values = []
+    for template, value in values.items():
+        pattern = re.sub(r'\\{\w+\\}', '[^/]+', re.escape(template))
+        compiled_values.append((re.compile(f'^{pattern}$'), value))
+    return compiled_values
+
+
+def _matches_end_point(key, end_point, recursive):
+    """Check whether a cache key belongs to end_point, including query parameters and optionally sub end points."""
+    return key == end_point or key.startswith(f'{end_point}?') or (recursive and key.startswith(f'{end_point}/'))
+
+
+class MemoryResponseCache(object):
+    """In-memory least recently used response cache."""
+
+    def __init__(self, maxsize=1024):
+        """
+        Construct a new in-memory response cache.
+
+        :param maxsize: Maximum number of cached responses
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a cached response, return None if not cached.
+
+        :param key: cache key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """
+        Store a response in the cache.
+
+        :param key: cache key
+        :param entry: CacheEntry
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, end_point, recursive=False):
+        """
+        Remove the cached responses of an end point.
+
+        :param end_point: end point
+        :param recursive: Also remove the cached responses of sub end points
+        """
+        with self._lock:
+            for key in [key for key in self._entries if _matches_end_point(key, end_point, recursive)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(object):
+    """On-disk SQLite response cache, shared between processes."""
+
+    def __init__(self, path):
+        """
+        Construct a new SQLite response cache.
+
+        :param path: path to the SQLite database file, created if it does not exist
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses '
+            '(key TEXT PRIMARY KEY, content BLOB, etag TEXT, last_modified TEXT, stored_at REAL)'
+        )
+
+    def get(self, key):
+        """
+        Get a cached response, return None if not cached.
+
+        :param key: cache key
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT content, etag, last_modified, stored_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def set(self, key, entry):
+        """
+        Store a response in the cache.
+
+        :param key: cache key
+        :param entry: CacheEntry
+        """
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, content, etag, last_modified, stored_at) VALUES (?, ?, ?, ?, ?)',
+                (key, entry.content, entry.etag, entry.last_modified, entry.stored_at)
+            )
+
+    def invalidate(self, end_point, recursive=False):
+        """
+        Remove the cached responses of an end point.
+
+        :param end_point: end point
+        :param recursive: Also remove the cached responses of sub end points
+        """
+        query = 'DELETE FROM responses WHERE key = ? OR substr(key, 1, ?) = ?'
+        parameters = [end_point, len(end_point) + 1, f'{end_point}?']
+        if recursive:
+            query += ' OR substr(key, 1, ?) = ?'
+            parameters += [len(end_point) + 1, f'{end_point}/']
+        with self._lock:
+            self._connection.execute(query, parameters)
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+
+    def close(self):
+        self._connection.close()
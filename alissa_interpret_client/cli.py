@@ -1,21 +1,157 @@
 import argparse
+import json
+import os
+import sys
 
-from alissa_interpret_client.alissa_interpret import AlissaInterpret
+# Only standard library modules are imported at startup, the client and its dependencies are imported when used.
+from alissa_interpret_client.daemon import SOCKET_ENVIRONMENT_VARIABLE, RemoteAlissaInterpret, is_running
+from alissa_interpret_client.metrics import Metrics
 
 
-def upload_vcf(args):
-    """Upload vcf file function."""
-    client = AlissaInterpret(
+def create_client(args, forward=True, **kwargs):
+    """
+    Create an Alissa Interpret client from the connection arguments.
+    Return a RemoteAlissaInterpret forwarding to the session daemon when a daemon is running on the socket.
+    Calls are not forwarded when metrics are requested, the metrics of forwarded requests are collected by the daemon.
+
+    :param args: parsed CLI arguments
+    :param forward: Forward to a running session daemon
+    :param kwargs: Optional AlissaInterpret arguments
+    """
+    socket_path = args.socket or os.environ.get(SOCKET_ENVIRONMENT_VARIABLE)
+    if forward and not args.metrics and socket_path and is_running(socket_path):
+        return RemoteAlissaInterpret(
+            socket_path, args.base_uri, args.client_id, args.client_secret, args.username, args.password
+        )
+
+    from alissa_interpret_client.alissa_interpret import AlissaInterpret
+    from alissa_interpret_client.token_cache import FileTokenCache
+
+    return AlissaInterpret(
         base_uri=args.base_uri,
         client_id=args.client_id,
         client_secret=args.client_secret,
         username=args.username,
-        password=args.password
+        password=args.password,
+        token_cache=FileTokenCache(args.token_cache) if args.token_cache else None,
+        metrics=args.metrics_collector,
+        **kwargs
     )
-    upload_vcf = client.post_data_file(args.vcf_file, type='VCF_FILE')
+
+
+def write_metrics(metrics, metrics_file):
+    """Write metrics to a file, in the Prometheus text format for .prom files and as JSON summary otherwise."""
+    with open(metrics_file, 'w') as output:
+        if metrics_file.endswith('.prom'):
+            output.write(metrics.prometheus())
+        else:
+            json.dump(metrics.summary(), output, indent=2)
+
+
+def upload_vcf(args):
+    """Upload vcf file function."""
+    client = create_client(args)
+    upload_vcf = client.post_data_file(os.path.abspath(args.vcf_file), type='VCF_FILE')
     print(upload_vcf)
 
 
+def export_variants(args):
+    """Export variants to a Parquet or Arrow file function."""
+    from alissa_interpret_client.arrow_export import write_variants
+
+    client = create_client(args)
+    variants = client.export_variants(
+        args.analysis_type, args.variant_type, args.analysis_id, max_not_found_polls=args.max_not_found_polls, stream=True
+    )
+    variant_count = write_variants(
+        variants, args.output, format=args.format, batch_size=args.batch_size, rows_per_file=args.rows_per_file
+    )
+    print(f'Exported {variant_count} variants to {args.output}')
+
+
+def ingest(args):
+    """Ingest samplesheet function: create patients, upload vcf files and create lab results."""
+    from alissa_interpret_client.ingest import IngestPipeline, read_samplesheet
+
+    client = create_client(args)
+    samples = read_samplesheet(args.samplesheet)
+    pipeline = IngestPipeline(client, args.journal or f'{args.samplesheet}.journal', workers=args.workers)
+    summary = pipeline.run(samples, progress=lambda step, key, result: print(f'{step}\t{key}\t{result["id"]}'))
+    print(json.dumps(summary, indent=2))
+    if summary['errors']:
+        sys.exit(1)
+
+
+def manual_review(args):
+    """Count manual review variants of in progress analyses function, progress is reported on stderr."""
+    from alissa_interpret_client.manual_review import ManualReviewStore, ManualReviewSync
+
+    def report_progress(done, total, eta, analysis_reference):
+        print(f'[{done}/{total}] {analysis_reference} ETA {int(eta // 60)}m{int(eta % 60):02d}s', file=sys.stderr)
+
+    client = create_client(args)
+    store = ManualReviewStore(args.database_file)
+    try:
+        if args.import_tsv:
+            print(f'Imported {store.import_tsv(args.import_tsv)} analyses from {args.import_tsv}.', file=sys.stderr)
+        sync = ManualReviewSync(
+            client, store, workers=args.workers, full=args.full, export_timeout=args.export_timeout,
+            max_not_found_polls=args.max_not_found_polls
+        )
+        summary = sync.run(progress=report_progress)
+        if args.tsv_file:
+            store.export_tsv(args.tsv_file)
+    finally:
+        store.close()
+    print(json.dumps(summary, indent=2))
+    if summary['errors']:
+        sys.exit(1)
+
+
+def serve(args):
+    """Session daemon function: serve one authenticated, pooled client with a response cache on a Unix socket."""
+    import signal
+
+    from alissa_interpret_client.cache import MemoryResponseCache
+    from alissa_interpret_client.daemon import SessionDaemon
+
+    socket_path = args.socket or os.environ.get(SOCKET_ENVIRONMENT_VARIABLE)
+    if not socket_path:
+        sys.exit(f'Set the socket path with --socket or {SOCKET_ENVIRONMENT_VARIABLE}')
+    client = create_client(
+        args, forward=False, pool_maxsize=args.pool_maxsize, cache=MemoryResponseCache(maxsize=args.cache_size)
+    )
+    daemon = SessionDaemon(client, socket_path, args.client_id, args.client_secret, args.username, args.password)
+    print(f'Serving {args.base_uri} on {socket_path}', file=sys.stderr)
+
+    def stop(signal_number, frame):
+        raise KeyboardInterrupt()
+    signal.signal(signal.SIGTERM, stop)  # Remove the socket when stopped
+    try:
+        daemon.serve(idle_timeout=args.idle_timeout)
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_argument(value):
+    """Parse a command line argument as JSON value, fall back to a string."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def call(args):
+    """Call a client method function, print the result as JSON."""
+    client = create_client(args)
+    result = getattr(client, args.method)(
+        *[parse_argument(value) for value in args.arguments], **json.loads(args.kwargs or '{}')
+    )
+    if not isinstance(result, (dict, list)) and hasattr(result, '__iter__'):
+        result = list(result)
+    print(json.dumps(result, indent=2))
+
+
 def main():
     """CLI entry point."""
 
@@ -30,6 +166,18 @@ def main():
     alissa_connection_parser.add_argument('client_secret', help='Alissa API client secret')
     alissa_connection_parser.add_argument('username', help='Alissa API username')
     alissa_connection_parser.add_argument('password', help='Alissa API password')
+    alissa_connection_parser.add_argument(
+        '--token_cache', type=str, help='Token cache file path, used to reuse the Alissa API token between runs'
+    )
+    alissa_connection_parser.add_argument(
+        '--metrics', type=str,
+        help='Write request metrics to this file on exit, Prometheus text format for .prom files, JSON otherwise'
+    )
+    alissa_connection_parser.add_argument(
+        '--socket', type=str,
+        help=f'Unix socket of the session daemon (alissa_client serve), default ${SOCKET_ENVIRONMENT_VARIABLE}. '
+             'Requests are forwarded to the daemon when it is running.'
+    )
 
     parser_upload_vcf = subparser.add_parser(
         'upload_vcf', parents=[alissa_connection_parser], help='Upload VCF to Alissa Interpret'
@@ -37,8 +185,96 @@ def main():
     parser_upload_vcf.add_argument('vcf_file', type=str, help='VCF file path')
     parser_upload_vcf.set_defaults(func=upload_vcf)
 
+    parser_export_variants = subparser.add_parser(
+        'export_variants', parents=[alissa_connection_parser], help='Export analysis variants to a Parquet or Arrow file'
+    )
+    parser_export_variants.add_argument('analysis_type', choices=['PATIENT', 'INHERITANCE'], help='Analysis type')
+    parser_export_variants.add_argument(
+        'variant_type', choices=['molecular_variant', 'copy_number_variation'], help='Variant type'
+    )
+    parser_export_variants.add_argument('analysis_id', type=int, help='Analysis id')
+    parser_export_variants.add_argument('output', type=str, help='Output file path, or directory with --rows_per_file')
+    parser_export_variants.add_argument('--format', choices=['parquet', 'arrow'], default='parquet', help='Output format')
+    parser_export_variants.add_argument(
+        '--batch_size', type=int, default=10000, help='Number of variants converted and written at once'
+    )
+    parser_export_variants.add_argument(
+        '--rows_per_file', type=int, help='Partition the output into files with at most this number of variants'
+    )
+    parser_export_variants.add_argument(
+        '--max_not_found_polls', type=int, default=3,
+        help='Number of export polls answered with 404 or 409 that are treated as not ready before the export fails'
+    )
+    parser_export_variants.set_defaults(func=export_variants)
+
+    parser_ingest = subparser.add_parser(
+        'ingest', parents=[alissa_connection_parser],
+        help='Create patients, upload VCF files and create lab results for all samples in a samplesheet'
+    )
+    parser_ingest.add_argument(
+        'samplesheet', type=str,
+        help='Tab separated samplesheet with columns accession_number, family_identifier, gender, folder_name, comments, '
+             'vcf_file and sample'
+    )
+    parser_ingest.add_argument(
+        '--journal', type=str, help='Journal file used to resume a failed run, default <samplesheet>.journal'
+    )
+    parser_ingest.add_argument('--workers', type=int, default=4, help='Number of concurrent requests')
+    parser_ingest.set_defaults(func=ingest)
+
+    parser_manual_review = subparser.add_parser(
+        'manual_review', parents=[alissa_connection_parser],
+        help='Count manual review variants in patient and inheritance analyses and store the counts in a SQLite database'
+    )
+    parser_manual_review.add_argument(
+        'database_file', type=str,
+        help='Path to (new or existing) SQLite database file containing data from earlier runs, used to skip reoccurring '
+             'exports and to resume an interrupted run.'
+    )
+    parser_manual_review.add_argument(
+        '--full', action='store_true', help='Ignore the high water mark and check all analyses of the past year.'
+    )
+    parser_manual_review.add_argument('--tsv_file', type=str, help='Write all analyses to a tab separated file after the run.')
+    parser_manual_review.add_argument(
+        '--import_tsv', type=str, help='Import a tab separated database file created by earlier versions.'
+    )
+    parser_manual_review.add_argument('--workers', type=int, default=4, help='Number of analyses processed concurrently')
+    parser_manual_review.add_argument(
+        '--export_timeout', type=int, default=3600,
+        help='Seconds to wait for an export, the analysis is retried in the next run when exceeded'
+    )
+    parser_manual_review.add_argument(
+        '--max_not_found_polls', type=int, default=3,
+        help='Number of export polls answered with 404 or 409 that are treated as not ready before the analysis fails'
+    )
+    parser_manual_review.set_defaults(func=manual_review)
+
+    parser_serve = subparser.add_parser(
+        'serve', parents=[alissa_connection_parser],
+        help='Run a session daemon on a Unix socket, holding an authenticated session and response cache for other calls'
+    )
+    parser_serve.add_argument(
+        '--idle_timeout', type=float, help='Stop the daemon after this number of seconds without requests'
+    )
+    parser_serve.add_argument('--pool_maxsize', type=int, default=20, help='Maximum number of kept alive connections')
+    parser_serve.add_argument('--cache_size', type=int, default=1024, help='Maximum number of cached responses')
+    parser_serve.set_defaults(func=serve)
+
+    parser_call = subparser.add_parser(
+        'call', parents=[alissa_connection_parser], help='Call a client method and print the result as JSON'
+    )
+    parser_call.add_argument('method', type=str, help='Client method, for example get_analysis')
+    parser_call.add_argument('arguments', nargs='*', help='Method arguments, parsed as JSON values when possible')
+    parser_call.add_argument('--kwargs', type=str, help='Method keyword arguments as JSON object')
+    parser_call.set_defaults(func=call)
+
     args = parser.parse_args()
-    args.func(args)
+    args.metrics_collector = Metrics() if getattr(args, 'metrics', None) else None
+    try:
+        args.func(args)
+    finally:
+        if args.metrics_collector:
+            write_metrics(args.metrics_collector, args.metrics)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,367 @@
+import builtins
+from collections.abc import Iterator
+import hashlib
+import hmac
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+SOCKET_ENVIRONMENT_VARIABLE = 'ALISSA_CLIENT_SOCKET'
+
+# Streamed results are written in chunks of about this number of bytes.
+STREAM_CHUNK_SIZE = 65536
+
+
+class RemoteError(Exception):
+    """Error raised by the daemon while handling a request."""
+
+    def __init__(self, type, message, status_code=None):
+        super().__init__(f'{type}: {message}')
+        self.type = type
+        self.message = message
+        self.status_code = status_code
+
+
+def credential_fingerprint(client_secret, password):
+    """Return a fingerprint of the client secret and password, used to reject requests with other credentials."""
+    return hashlib.sha256(f'{client_secret}\n{password}'.encode('utf-8')).hexdigest()
+
+
+def remote_exception(error):
+    """
+    Convert an error encoded by the daemon to the exception the client would have raised: requests exceptions,
+    with a response holding the status code, ExportTimeoutError and built-in exceptions. Other errors are raised as
+    their built-in base class, for example ValueError, or as RemoteError.
+
+    :param error: dict with type, base, message and status_code
+    """
+    type_name, message, status_code = error['type'], error['message'], error.get('status_code')
+    builtin = getattr(builtins, type_name, None)
+    if isinstance(builtin, type) and issubclass(builtin, Exception):
+        return builtin(message)
+    if type_name == 'ExportTimeoutError':
+        from .exports import ExportTimeoutError
+        return ExportTimeoutError(message)
+
+    # requests is imported when needed, to keep forwarded CLI calls fast.
+    import requests
+    exception_class = getattr(requests.exceptions, type_name, None)
+    if isinstance(exception_class, type) and issubclass(exception_class, requests.exceptions.RequestException):
+        response = None
+        if status_code is not None:
+            response = requests.models.Response()
+            response.status_code = status_code
+        return exception_class(message, response=response)
+    base = getattr(builtins, error.get('base') or 'Exception')
+    if base is not Exception:
+        return base(message)
+    return RemoteError(type_name, message, status_code)
+
+
+def daemon_methods(client_class):
+    """Return the names of the client methods served by the daemon: get_, post_ and iter_ methods and export_variants."""
+    return frozenset(
+        name for name in dir(client_class)
+        if name.startswith(('get_', 'post_', 'iter_')) or name == 'export_variants'
+    )
+
+
+def _json_result(result):
+    """Convert iterable results that are not iterators, such as a VariantTable, to lists so they can be send as JSON."""
+    if isinstance(result, (dict, list, str, int, float, bool)) or result is None:
+        return result
+    return list(result)
+
+
+def _encode_error(error):
+    """Encode an exception as JSON object, with the name of its nearest built-in base class."""
+    return {
+        'type': type(error).__name__,
+        'base': next(cls.__name__ for cls in type(error).__mro__ if getattr(builtins, cls.__name__, None) is cls),
+        'message': str(error),
+        'status_code': getattr(getattr(error, 'response', None), 'status_code', None),
+    }
+
+
+def _encode_exceptions(value):
+    """JSON default function encoding exceptions in results, for example get_analyses_by_ids(return_exceptions=True)."""
+    if isinstance(value, Exception):
+        return {'__remote_error__': _encode_error(value)}
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _decode_exceptions(value):
+    """JSON object hook decoding exceptions in results, see remote_exception."""
+    if '__remote_error__' in value and len(value) == 1:
+        return remote_exception(value['__remote_error__'])
+    return value
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle JSON-lines requests of a single connection until the connection is closed.
+    A result is send as one {"result": ...} line. Iterators, such as iter_ results and streamed exports, are send as a
+    {"stream": true} line followed by one {"item": ...} line per item and an {"end": true} or {"error": ...} line, so
+    neither the daemon nor the caller holds all items in memory.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            self.server.track_request(1)
+            try:
+                self._handle_request(line)
+            except (BrokenPipeError, ConnectionResetError):
+                return  # Caller closed the connection, for example while abandoning a stream
+            finally:
+                self.server.track_request(-1)
+
+    def _write(self, data):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def _handle_request(self, line):
+        try:
+            result = self.server.call(json.loads(line))
+            if not isinstance(result, Iterator):
+                response = json.dumps({'result': _json_result(result)}, default=_encode_exceptions)
+        except Exception as error:
+            result = None
+            response = json.dumps({'error': _encode_error(error)})
+        if isinstance(result, Iterator):
+            self._stream(result)
+        else:
+            self._write(response.encode('utf-8') + b'\n')
+
+    def _stream(self, items):
+        self._write(b'{"stream": true}\n')
+        chunk = []
+        chunk_size = 0
+        try:
+            for item in items:
+                item_line = json.dumps({'item': item}, default=_encode_exceptions).encode('utf-8') + b'\n'
+                chunk.append(item_line)
+                chunk_size += len(item_line)
+                if chunk_size >= STREAM_CHUNK_SIZE:
+                    self._write(b''.join(chunk))
+                    chunk = []
+                    chunk_size = 0
+            chunk.append(b'{"end": true}\n')
+        except Exception as error:
+            chunk.append(json.dumps({'error': _encode_error(error)}).encode('utf-8') + b'\n')
+        finally:
+            if hasattr(items, 'close'):
+                items.close()
+        self._write(b''.join(chunk))
+
+
+class SessionDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Long-lived process serving the methods of one authenticated, pooled AlissaInterpret client as JSON-lines requests
+    on a Unix socket, only accessible by the current user. Short-lived CLI calls forward to the daemon with
+    RemoteAlissaInterpret instead of importing requests and fetching a token on every invocation.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, client, socket_path, client_id, client_secret, username, password):
+        """
+        Construct a new session daemon listening on socket_path.
+
+        :param client: AlissaInterpret client
+        :param socket_path: Unix socket path, created with mode 0600
+        :param client_id: client id of the client, requests for other accounts are rejected
+        :param client_secret: client secret of the client, requests with other credentials are rejected
+        :param username: account name of the client, requests for other accounts are rejected
+        :param password: account password of the client, requests with other credentials are rejected
+        """
+        self.client = client
+        self.socket_path = socket_path
+        self.account = {
+            'base_uri': client.base_uri, 'client_id': client_id, 'username': username,
+            'credentials': credential_fingerprint(client_secret, password),
+        }
+        self.methods = daemon_methods(type(client))
+        self.last_activity = time.monotonic()
+        self.active_requests = 0
+        self._activity_lock = threading.Lock()
+
+        # Remove a stale socket of a stopped daemon, but never take over the socket of a running daemon.
+        if os.path.exists(socket_path):
+            if is_running(socket_path):
+                raise OSError(f'A daemon is already listening on {socket_path}')
+            os.unlink(socket_path)
+        umask = os.umask(0o177)  # Create the socket with mode 0600
+        try:
+            super().__init__(socket_path, _DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def track_request(self, change):
+        """Track the number of active requests and the time of the last activity, used by the idle timeout."""
+        with self._activity_lock:
+            self.active_requests += change
+            self.last_activity = time.monotonic()
+
+    def _is_idle(self, idle_timeout):
+        with self._activity_lock:
+            return not self.active_requests and time.monotonic() - self.last_activity >= idle_timeout
+
+    def call(self, request):
+        """Call a client method for a request dict with method, args, kwargs and the account fields."""
+        for field, value in self.account.items():
+            if not hmac.compare_digest(str(request.get(field)).encode('utf-8'), value.encode('utf-8')):
+                raise PermissionError(f'Daemon serves a different {field}')
+        method = request.get('method')
+        if method not in self.methods:
+            raise AttributeError(f'Method not served by daemon: {method}')
+        return getattr(self.client, method)(*request.get('args', []), **request.get('kwargs', {}))
+
+    def serve(self, idle_timeout=None):
+        """
+        Serve requests until stopped, the socket is removed on exit.
+
+        :param idle_timeout: Optional seconds without requests after which the daemon stops
+        """
+        if idle_timeout:
+            def stop_when_idle():
+                while not self._is_idle(idle_timeout):
+                    time.sleep(min(1, idle_timeout / 10))
+                self.shutdown()
+            threading.Thread(target=stop_when_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def is_running(socket_path):
+    """Return True if a daemon accepts connections on socket_path."""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+
+class RemoteAlissaInterpret(object):
+    """
+    Proxy forwarding AlissaInterpret method calls to a SessionDaemon, for example client.get_analysis(46098).
+    Arguments and results are send as JSON. iter_ methods and export_variants(..., stream=True) return iterators
+    reading the items from the socket while they are consumed, over a separate connection per call.
+    Errors are raised as the exceptions the client would have raised, see remote_exception.
+    Each thread uses its own connection.
+    """
+
+    def __init__(self, socket_path, base_uri, client_id, client_secret, username, password):
+        """
+        Construct a new daemon proxy.
+
+        :param socket_path: Unix socket path of the daemon
+        :param base_uri: Base uri for the Alissa server, must match the daemon
+        :param client_id: client id, must match the daemon
+        :param client_secret: client secret, must match the daemon
+        :param username: account name of the Alissa user account, must match the daemon
+        :param password: account password of the Alissa user account, must match the daemon
+        """
+        self.socket_path = socket_path
+        self.base_uri = base_uri
+        self.metrics = None
+        self._account = {
+            'base_uri': base_uri, 'client_id': client_id, 'username': username,
+            'credentials': credential_fingerprint(client_secret, password),
+        }
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.socket_path)
+        return connection, connection.makefile('rwb')
+
+    def _connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection, self._local.file = self._connect()
+        return self._local.file
+
+    def close(self):
+        """Close the connection of the current thread."""
+        if getattr(self._local, 'connection', None) is not None:
+            self._local.file.close()
+            self._local.connection.close()
+            self._local.connection = None
+
+    def _iter_stream(self, connection):
+        """Yield the items of a streamed result."""
+        for line in connection:
+            response = json.loads(line, object_hook=_decode_exceptions)
+            if 'item' in response:
+                yield response['item']
+            elif 'end' in response:
+                return
+            else:
+                raise remote_exception(response['error'])
+        raise ConnectionError('Daemon closed the connection')
+
+    def _iter_call(self, request):
+        """Send a request over a separate connection and yield the items of the result while they are received."""
+        connection, connection_file = self._connect()
+        try:
+            connection_file.write(json.dumps(request).encode('utf-8') + b'\n')
+            connection_file.flush()
+            response = json.loads(connection_file.readline() or b'{}', object_hook=_decode_exceptions)
+            if 'stream' in response:
+                for item in self._iter_stream(connection_file):
+                    yield item
+            elif 'error' in response:
+                raise remote_exception(response['error'])
+            elif 'result' in response:
+                for item in response['result']:
+                    yield item
+            else:
+                raise ConnectionError('Daemon closed the connection')
+        finally:
+            connection_file.close()
+            connection.close()
+
+    def call(self, method, *args, **kwargs):
+        """
+        Call a client method on the daemon and return the result.
+
+        :param method: AlissaInterpret method name
+        """
+        request = dict(self._account, method=method, args=args, kwargs=kwargs)
+        if method.startswith('iter_') or kwargs.get('stream'):
+            return self._iter_call(request)
+
+        connection = self._connection()
+        try:
+            connection.write(json.dumps(request).encode('utf-8') + b'\n')
+            connection.flush()
+            line = connection.readline()
+            if not line:
+                raise ConnectionError('Daemon closed the connection')
+            response = json.loads(line, object_hook=_decode_exceptions)
+            if 'stream' in response:
+                return list(self._iter_stream(connection))
+        except OSError:
+            self.close()
+            raise
+        if 'error' in response:
+            raise remote_exception(response['error'])
+        return response['result']
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        return method
@@ -0,0 +1,108 @@
+from collections import deque, namedtuple
+import heapq
+import itertools
+import time
+
+from requests.exceptions import RequestException
+
+from . import exports
+from .transport import RateLimiter
+
+ExportJob = namedtuple('ExportJob', ['analysis_id', 'analysis_type', 'variant_type'])
+ExportResult = namedtuple('ExportResult', ['job', 'variants', 'error'])
+
+
+class ExportScheduler(object):
+    """
+    Run variant exports of many analyses concurrently.
+    Exports are requested up front and all outstanding exports are polled in a single loop,
+    so the export generation on the server overlaps instead of running one analysis at a time.
+    """
+
+    def __init__(
+        self, client, requests_per_second=5, max_in_flight=10, marked_review=False, marked_include_report=False,
+        timeout=3600, initial_delay=1, max_delay=30, backoff=1.5, max_not_found_polls=3, stream=False
+    ):
+        """
+        Construct a new export scheduler.
+
+        :param client: AlissaInterpret client
+        :param requests_per_second: Maximum number of export requests and polls per second, None disables the limit
+        :param max_in_flight: Maximum number of exports requested but not yet retrieved, None disables the limit
+        :param marked_review: Filter on marked for review
+        :param marked_include_report: Filter on marked include in report
+        :param timeout: Seconds to wait for each export, exceeded exports result in an ExportTimeoutError
+        :param initial_delay: Seconds to wait before the first poll of an export
+        :param max_delay: Maximum seconds between polls of an export
+        :param backoff: Multiplier applied to the delay after every poll of an export
+        :param max_not_found_polls: Number of polls of an export answered with 404 or 409 that are treated as not ready
+                                    before the export fails, None treats them as not ready until the timeout
+        :param stream: Yield results with an iterator over the streamed variants instead of a list,
+                       the iterator holds a connection until it is exhausted.
+        """
+        self.client = client
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.max_in_flight = max_in_flight
+        self.marked_review = marked_review
+        self.marked_include_report = marked_include_report
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.max_not_found_polls = max_not_found_polls
+        self.stream = stream
+
+    def _request_export(self, job):
+        """Request an export, return the export end point and poll schedule."""
+        poll_schedule = exports.PollSchedule(
+            self.initial_delay, self.max_delay, self.backoff, self.timeout, self.max_not_found_polls
+        )
+        self.rate_limiter.acquire()
+        export_id = self.client.post_variants_export(
+            job.analysis_type, job.variant_type, job.analysis_id, self.marked_review, self.marked_include_report
+        )['exportId']
+        return exports.export_end_point(job.analysis_type, job.variant_type, job.analysis_id, export_id), poll_schedule
+
+    def run(self, jobs):
+        """
+        Export variants for all jobs, yield an ExportResult for every job in order of completion.
+        Failed jobs yield an ExportResult containing the error instead of variants.
+
+        :param jobs: Iterable of ExportJob (analysis_id, analysis_type, variant_type) tuples
+        """
+        pending = deque(ExportJob(*job) for job in jobs)
+        in_flight = []  # Heap of (next poll time, sequence, job, end point, poll schedule)
+        sequence = itertools.count()
+
+        while pending or in_flight:
+            while pending and (self.max_in_flight is None or len(in_flight) < self.max_in_flight):
+                job = pending.popleft()
+                try:
+                    end_point, poll_schedule = self._request_export(job)
+                except (RequestException, ValueError, KeyError) as error:
+                    yield ExportResult(job, None, error)
+                    continue
+                next_poll = time.monotonic() + poll_schedule.next_delay()
+                heapq.heappush(in_flight, (next_poll, next(sequence), job, end_point, poll_schedule))
+
+            if not in_flight:
+                continue
+
+            next_poll, _, job, end_point, poll_schedule = heapq.heappop(in_flight)
+            delay = next_poll - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            self.rate_limiter.acquire()
+            try:
+                response = self.client._poll_export(end_point, poll_schedule, stream=self.stream)
+                if response is None:
+                    next_poll = time.monotonic() + poll_schedule.next_delay()
+                    heapq.heappush(in_flight, (next_poll, next(sequence), job, end_point, poll_schedule))
+                elif self.stream:
+                    yield ExportResult(job, self.client._export_records(self.client._iter_json_array(response)), None)
+                else:
+                    variants = self.client.json_backend.loads(response.content)
+                    yield ExportResult(job, list(self.client._export_records(variants)), None)
+            except (RequestException, ValueError, exports.ExportTimeoutError) as error:
+                yield ExportResult(job, None, error)
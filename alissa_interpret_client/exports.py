@@ -0,0 +1,81 @@
+import time
+
+ANALYSIS_TYPE_END_POINTS = {
+    'PATIENT': 'patient_analyses',
+    'INHERITANCE': 'inheritance_analyses',
+}
+VARIANT_TYPE_END_POINTS = {
+    'molecular_variant': 'molecular_variants',
+    'copy_number_variation': 'copy_number_variations',
+}
+# Status codes returned while an export is still being generated.
+EXPORT_NOT_READY_STATUS_CODES = frozenset([202, 204])
+# Status codes that may be returned right after an export was requested, before the export is known to every server.
+# Only tolerated for a few polls, so a wrong analysis or export id fails instead of polling until the timeout.
+EXPORT_NOT_FOUND_STATUS_CODES = frozenset([404, 409])
+
+
+class ExportTimeoutError(Exception):
+    """Raised when an export is not ready before the deadline."""
+
+
+def export_end_point(analysis_type, variant_type, analysis_id, export_id=None):
+    """
+    Return the export end point for an analysis.
+
+    :param analysis_type: Analysis type, PATIENT or INHERITANCE
+    :param variant_type: Variant type, molecular_variant or copy_number_variation
+    :param analysis_id: analysis id
+    :param export_id: Optional export id, without export id the end point to request a new export is returned
+    """
+    if analysis_type not in ANALYSIS_TYPE_END_POINTS:
+        raise ValueError(f'Unknown analysis type: {analysis_type}')
+    if variant_type not in VARIANT_TYPE_END_POINTS:
+        raise ValueError(f'Unknown variant type: {variant_type}')
+
+    end_point = (
+        f'{ANALYSIS_TYPE_END_POINTS[analysis_type]}/{analysis_id}/{VARIANT_TYPE_END_POINTS[variant_type]}/exports'
+    )
+    if export_id is not None:
+        end_point = f'{end_point}/{export_id}'
+    return end_point
+
+
+class PollSchedule(object):
+    """Exponential backoff schedule for polling an export, with an overall deadline."""
+
+    def __init__(self, initial_delay=1, max_delay=30, backoff=1.5, timeout=3600, max_not_found_polls=3):
+        """
+        Construct a new poll schedule, the deadline starts counting at construction.
+
+        :param initial_delay: Seconds to wait before the first poll
+        :param max_delay: Maximum seconds between polls
+        :param backoff: Multiplier applied to the delay after every poll
+        :param timeout: Seconds before the export is considered failed, None disables the deadline
+        :param max_not_found_polls: Number of polls answered with a not found status that are treated as not ready,
+                                    None treats not found statuses as not ready until the timeout
+        """
+        self.delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.polls = 0
+        self.max_not_found_polls = max_not_found_polls
+        self.not_found_polls = 0
+
+    def not_found(self):
+        """Count a poll answered with a not found status, return True while such polls are treated as not ready."""
+        self.not_found_polls += 1
+        return self.max_not_found_polls is None or self.not_found_polls <= self.max_not_found_polls
+
+    def next_delay(self):
+        """Return the seconds to wait before the next poll and advance the schedule, raise ExportTimeoutError when expired."""
+        delay = self.delay
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise ExportTimeoutError(f'Export not ready after {self.polls} polls.')
+            delay = min(delay, remaining)
+        self.delay = min(self.delay * self.backoff, self.max_delay)
+        self.polls += 1
+        return delay
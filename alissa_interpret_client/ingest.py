@@ -0,0 +1,202 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import csv
+import json
+import os
+
+from requests.exceptions import RequestException
+
+
+SAMPLESHEET_COLUMNS = ['accession_number', 'family_identifier', 'gender', 'folder_name', 'comments', 'vcf_file', 'sample']
+
+
+def read_samplesheet(samplesheet_file):
+    """
+    Read a tab separated samplesheet, return a list of sample dicts.
+    Required columns: accession_number, family_identifier, gender, folder_name, vcf_file and sample, comments is optional.
+    Relative vcf_file paths are relative to the samplesheet. vcf_file is kept as written in the samplesheet and used as
+    key in the ingest journal, so a run can be resumed after moving the samplesheet directory. vcf_path is the path
+    to upload.
+
+    :param samplesheet_file: path to samplesheet
+    """
+    with open(samplesheet_file, 'r', newline='') as samplesheet:
+        samples = list(csv.DictReader(samplesheet, delimiter='\t'))
+
+    missing_columns = [
+        column for column in SAMPLESHEET_COLUMNS if column != 'comments' and samples and column not in samples[0]
+    ]
+    if missing_columns:
+        raise ValueError(f'Samplesheet is missing columns: {", ".join(missing_columns)}')
+
+    samplesheet_dir = os.path.dirname(os.path.abspath(samplesheet_file))
+    for sample in samples:
+        sample['comments'] = sample.get('comments') or ''
+        sample['vcf_path'] = os.path.join(samplesheet_dir, sample['vcf_file'])
+    return samples
+
+
+class IngestJournal(object):
+    """Append-only journal of completed ingest steps, used to resume a failed run where it stopped."""
+
+    def __init__(self, path):
+        """
+        Open or create an ingest journal.
+
+        :param path: path to journal file
+        """
+        self.path = path
+        self.patients = {}  # accession number: patient id
+        self.data_files = {}  # vcf file: data file id
+        self.lab_results = {}  # (accession number, vcf file, sample): lab result id
+        try:
+            with open(path, 'r') as journal:
+                for line in journal:
+                    if line.strip():
+                        self._apply(json.loads(line))
+        except FileNotFoundError:
+            pass
+        self._journal = open(path, 'a')
+
+    def _apply(self, entry):
+        if entry['step'] == 'patient':
+            self.patients[entry['accession_number']] = entry['id']
+        elif entry['step'] == 'data_file':
+            self.data_files[entry['vcf_file']] = entry['id']
+        elif entry['step'] == 'lab_result':
+            self.lab_results[(entry['accession_number'], entry['vcf_file'], entry['sample'])] = entry['id']
+
+    def record(self, **entry):
+        """Record a completed step, written to disk immediately."""
+        self._apply(entry)
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def close(self):
+        self._journal.close()
+
+
+class IngestPipeline(object):
+    """
+    Onboard samples: create patients, upload vcf files and create lab results.
+    Patients and uploads run concurrently, each lab result is created as soon as its patient and data file exist.
+    Existing patients are found with a single pass over all patients, vcf files shared by samples are uploaded once.
+    """
+
+    def __init__(self, client, journal_file, workers=4, data_file_type='VCF_FILE'):
+        """
+        Construct a new ingest pipeline.
+
+        :param client: AlissaInterpret client, use a pool_maxsize of at least workers
+        :param journal_file: path to journal file used to resume a failed run
+        :param workers: Number of concurrent requests
+        :param data_file_type: The type of the uploaded data files
+        """
+        self.client = client
+        self.journal_file = journal_file
+        self.workers = workers
+        self.data_file_type = data_file_type
+
+    def _find_patients(self, accession_numbers):
+        """Find existing patients by accession number with a single pass over all patients."""
+        accession_numbers = set(accession_numbers)
+        patients = {}
+        for patient in self.client.iter_patients():
+            if patient['accessionNumber'] in accession_numbers:
+                patients[patient['accessionNumber']] = patient['id']
+        return patients
+
+    def run(self, samples, progress=None):
+        """
+        Ingest samples, return a summary dict with the number of created items and the errors.
+        Steps depending on a failed step are skipped, rerun with the same journal to retry them.
+
+        :param samples: List of sample dicts, see read_samplesheet. vcf_path is uploaded when set, otherwise vcf_file.
+        :param progress: Optional callback called with (step, key, result) after every completed step
+        """
+        journal = IngestJournal(self.journal_file)
+        summary = {'patients_existing': 0, 'patients_created': 0, 'data_files_uploaded': 0, 'lab_results_created': 0}
+        errors = []
+        try:
+            # Lookup patients not created in a previous run
+            samples_by_accession_number = {sample['accession_number']: sample for sample in samples}
+            missing_accession_numbers = [
+                accession_number for accession_number in samples_by_accession_number
+                if accession_number not in journal.patients
+            ]
+            if missing_accession_numbers:
+                for accession_number, patient_id in self._find_patients(missing_accession_numbers).items():
+                    journal.record(step='patient', accession_number=accession_number, id=patient_id)
+                    summary['patients_existing'] += 1
+
+            pending_lab_results = [
+                sample for sample in samples
+                if (sample['accession_number'], sample['vcf_file'], sample['sample']) not in journal.lab_results
+            ]
+            failed = set()
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {}
+                for accession_number, sample in samples_by_accession_number.items():
+                    if accession_number not in journal.patients:
+                        future = executor.submit(
+                            self.client.post_patient, accession_number, sample['family_identifier'], sample['gender'],
+                            sample['folder_name'], sample['comments']
+                        )
+                        futures[future] = ('patient', accession_number)
+                vcf_paths = {
+                    sample['vcf_file']: sample.get('vcf_path') or sample['vcf_file'] for sample in pending_lab_results
+                }
+                for vcf_file in sorted(vcf_paths):
+                    if vcf_file not in journal.data_files:
+                        futures[executor.submit(self.client.post_data_file, vcf_paths[vcf_file], self.data_file_type)] = (
+                            'data_file', vcf_file
+                        )
+
+                while futures or pending_lab_results:
+                    # Submit lab results of which the patient and data file are available
+                    waiting_lab_results = []
+                    for sample in pending_lab_results:
+                        accession_number, vcf_file = sample['accession_number'], sample['vcf_file']
+                        if accession_number in journal.patients and vcf_file in journal.data_files:
+                            future = executor.submit(
+                                self.client.post_lab_result, journal.patients[accession_number],
+                                journal.data_files[vcf_file], sample['sample']
+                            )
+                            futures[future] = ('lab_result', (accession_number, vcf_file, sample['sample']))
+                        elif ('patient', accession_number) not in failed and ('data_file', vcf_file) not in failed:
+                            waiting_lab_results.append(sample)
+                    pending_lab_results = waiting_lab_results
+                    if not futures:
+                        break
+
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        step, key = futures.pop(future)
+                        try:
+                            result = future.result()
+                            result_id = result['id']
+                        # Malformed responses (KeyError, TypeError, ValueError) only fail their own step.
+                        except (RequestException, OSError, KeyError, TypeError, ValueError) as error:
+                            failed.add((step, key))
+                            errors.append({'step': step, 'key': key, 'error': str(error)})
+                            continue
+
+                        if step == 'patient':
+                            journal.record(step=step, accession_number=key, id=result_id)
+                            summary['patients_created'] += 1
+                        elif step == 'data_file':
+                            journal.record(step=step, vcf_file=key, id=result_id)
+                            summary['data_files_uploaded'] += 1
+                        else:
+                            journal.record(
+                                step=step, accession_number=key[0], vcf_file=key[1], sample=key[2], id=result_id
+                            )
+                            summary['lab_results_created'] += 1
+                        if progress:
+                            progress(step, key, result)
+        finally:
+            journal.close()
+
+        summary['errors'] = errors
+        return summary
@@ -0,0 +1,36 @@
+from collections import namedtuple
+import json
+
+# JSON backends in order of preference, the first installed backend is used by default.
+BACKENDS = ('orjson', 'ujson', 'json')
+
+JSONBackend = namedtuple('JSONBackend', ['name', 'loads'])
+
+
+def _import_backend(name):
+    """Import a JSON backend, raise ImportError when it is not installed."""
+    if name == 'orjson':
+        import orjson
+        return JSONBackend(name, orjson.loads)
+    if name == 'ujson':
+        import ujson
+        return JSONBackend(name, ujson.loads)
+    if name == 'json':
+        return JSONBackend(name, json.loads)
+    raise ValueError(f'Unknown JSON backend: {name}, use one of {", ".join(BACKENDS)}')
+
+
+def get_backend(name=None):
+    """
+    Return a JSONBackend used to decode response bodies.
+    orjson and ujson decode large listings and exports several times faster than the standard library json module.
+
+    :param name: Optional backend name, orjson, ujson or json. Defaults to the first installed backend of BACKENDS.
+    """
+    if name is not None:
+        return _import_backend(name)
+    for name in BACKENDS:
+        try:
+            return _import_backend(name)
+        except ImportError:
+            continue
@@ -0,0 +1,54 @@
+import itertools
+
+# Manual review labels of the UMCU classification tree: Y, Y2 and Y3 (rare).
+MANUAL_REVIEW_LABELS = ('y,manual review', 'y2,manual review', 'y3 (rare),manual review')
+
+
+class LabelCounter(object):
+    """
+    Count occurrences of classification tree labels in variant exports.
+    The labels of a batch of variants are joined into a single string, so each label is counted with one scan per batch
+    instead of one scan per variant. Batches keep memory usage bounded for streamed exports.
+    """
+
+    def __init__(self, labels=MANUAL_REVIEW_LABELS, case_sensitive=False, batch_size=10000):
+        """
+        Construct a new label counter.
+
+        :param labels: Labels to count, matched as substrings of the classification tree labels of a variant
+        :param case_sensitive: Match labels case sensitive
+        :param batch_size: Number of variants counted at once
+        """
+        self.case_sensitive = case_sensitive
+        self.labels = [label if case_sensitive else label.lower() for label in labels]
+        self.batch_size = batch_size
+
+    def count(self, variants):
+        """
+        Count the labels in variants, return a list of counts in the order of the labels.
+
+        :param variants: Iterable of variants, for example a (streamed) variant export
+        """
+        counts = [0] * len(self.labels)
+        variants = iter(variants)
+        while True:
+            batch = list(itertools.islice(variants, self.batch_size))
+            if not batch:
+                return counts
+
+            # Variants are separated by a newline, which does not occur in labels, so matches never span two variants.
+            batch_labels = '\n'.join([
+                (variant.get('classificationTreeLabelsScore') or {}).get('labels') or '' for variant in batch
+            ])
+            if not self.case_sensitive:
+                batch_labels = batch_labels.lower()
+            for index, label in enumerate(self.labels):
+                counts[index] += batch_labels.count(label)
+
+    def count_dict(self, variants):
+        """
+        Count the labels in variants, return a dict mapping each label to its count.
+
+        :param variants: Iterable of variants, for example a (streamed) variant export
+        """
+        return dict(zip(self.labels, self.count(variants)))
@@ -0,0 +1,315 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import sqlite3
+import time
+
+from requests.exceptions import RequestException
+
+from .exports import ExportTimeoutError
+from .labels import LabelCounter
+
+COLUMNS = [
+    "analysis_reference", "analysis_type", "analysis_pipeline", "target_panel", "created_on", "last_updated_on",
+    "molecular_variant_count", "cnv_count", "manual_review_count_Y", "manual_review_count_Y2", "manual_review_count_Y3",
+    "CNV_manual_review_count_Y", "CNV_manual_review_count_Y2", "CNV_manual_review_count_Y3",
+]
+
+
+def variant_count(analysis_data, count_field):
+    """
+    Sum a variant count of the lab results of an analysis, missing or null counts are counted as 0.
+
+    :param analysis_data: patient or inheritance analysis
+    :param count_field: molecularVariantCount or copyNumberVariationCount
+    """
+    return sum(
+        (lab_result.get('analysisVariantCount') or {}).get(count_field) or 0
+        for lab_result in analysis_data.get('labResults') or []
+    )
+
+
+def one_year_before(date):
+    """
+    Return the date one year earlier, 29 February becomes 28 February.
+
+    :param date: datetime
+    """
+    if date.month == 2 and date.day == 29:
+        date = date.replace(day=28)
+    return date.replace(year=date.year - 1)
+
+
+class ManualReviewStore(object):
+    """Manual review counts per analysis, indexed by analysis reference, id and lastUpdatedOn."""
+
+    def __init__(self, path):
+        """
+        Open or create a manual review store.
+
+        :param path: path to the SQLite database file
+        """
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS analyses ('
+                'analysis_reference TEXT PRIMARY KEY, analysis_id INTEGER, analysis_type TEXT, analysis_pipeline TEXT, '
+                'target_panel TEXT, created_on TEXT, last_updated_on TEXT, molecular_variant_count INTEGER, '
+                'cnv_count INTEGER, manual_review_count_Y INTEGER, manual_review_count_Y2 INTEGER, '
+                'manual_review_count_Y3 INTEGER, CNV_manual_review_count_Y INTEGER, CNV_manual_review_count_Y2 INTEGER, '
+                'CNV_manual_review_count_Y3 INTEGER)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS analyses_id ON analyses (analysis_id)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS analyses_last_updated_on ON analyses (last_updated_on)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS analyses_created_on ON analyses (created_on)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)')
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, analysis_reference):
+        """Return the stored analysis as dict, or None if not stored."""
+        row = self.connection.execute(
+            'SELECT * FROM analyses WHERE analysis_reference = ?', (analysis_reference,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def references(self):
+        """Return the references of all stored analyses."""
+        return set(row[0] for row in self.connection.execute('SELECT analysis_reference FROM analyses'))
+
+    def upsert(self, analysis):
+        """
+        Insert or replace an analysis in a single transaction.
+
+        :param analysis: dict containing the analysis_id and all COLUMNS
+        """
+        columns = ['analysis_id'] + COLUMNS
+        with self.connection:
+            self.connection.execute(
+                f'INSERT OR REPLACE INTO analyses ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                [analysis.get(column) for column in columns]
+            )
+
+    def delete(self, analysis_references):
+        """Delete analyses by reference."""
+        with self.connection:
+            self.connection.executemany(
+                'DELETE FROM analyses WHERE analysis_reference = ?', [(reference,) for reference in analysis_references]
+            )
+
+    def delete_created_before(self, created_on):
+        """Delete analyses created before a date (YYYY-MM-DD)."""
+        with self.connection:
+            self.connection.execute('DELETE FROM analyses WHERE created_on < ?', (created_on,))
+
+    def get_state(self, key):
+        """Return a sync state value, or None if not set."""
+        row = self.connection.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        """Set a sync state value."""
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+    def import_tsv(self, tsv_file):
+        """Import analyses from a tab separated database file created by earlier versions of manual_review_analyses.py."""
+        with open(tsv_file, 'r') as database_file:
+            header = database_file.readline().strip().split('\t')
+            if header != COLUMNS:
+                raise ValueError('Database does not contain expected columns.')
+            analyses = []
+            for line in database_file:
+                analysis = dict(zip(header, line.rstrip('\n').split('\t')))
+                if 'skipped_large_analysis' not in analysis.values():
+                    analyses.append(analysis)
+
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO analyses ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})',
+                [[analysis[column] for column in COLUMNS] for analysis in analyses]
+            )
+        return len(analyses)
+
+    def export_tsv(self, tsv_file):
+        """Write all analyses to a tab separated file, dates are truncated to YYYY-MM-DD."""
+        with open(tsv_file, 'w') as database_file:
+            print('\t'.join(COLUMNS), file=database_file)
+            for row in self.connection.execute(f'SELECT {", ".join(COLUMNS)} FROM analyses ORDER BY created_on'):
+                analysis = dict(row)
+                analysis['created_on'] = analysis['created_on'][0:10]
+                analysis['last_updated_on'] = analysis['last_updated_on'][0:10]
+                print('\t'.join(str(analysis[column]) for column in COLUMNS), file=database_file)
+
+
+class ManualReviewSync(object):
+    """
+    Count manual review variants of in progress patient and inheritance analyses and store the counts in a
+    ManualReviewStore. Analyses are exported concurrently and stored as soon as they are counted, so the store is a
+    per analysis checkpoint: an interrupted run resumes with the analyses that were not stored yet.
+    Exports are streamed, memory usage does not depend on the size of an analysis.
+    """
+
+    def __init__(
+        self, client, store, workers=4, full=False, export_timeout=3600, initial_delay=1, max_not_found_polls=3,
+        label_counter=None
+    ):
+        """
+        Construct a new manual review sync.
+
+        :param client: AlissaInterpret client, use a pool_maxsize of at least workers
+        :param store: ManualReviewStore
+        :param workers: Number of analyses processed concurrently
+        :param full: Ignore the high water mark and check all in progress analyses of the past year
+        :param export_timeout: Seconds to wait for an export, the analysis is retried in the next run when exceeded
+        :param initial_delay: Seconds to wait before the first poll of an export
+        :param max_not_found_polls: Number of polls of an export answered with 404 or 409 that are treated as not ready
+                                    before the analysis fails, None treats them as not ready until the export_timeout
+        :param label_counter: Optional LabelCounter, defaults to the manual review labels Y, Y2 and Y3 (rare)
+        """
+        self.client = client
+        self.store = store
+        self.workers = workers
+        self.full = full
+        self.export_timeout = export_timeout
+        self.initial_delay = initial_delay
+        self.max_not_found_polls = max_not_found_polls
+        self.label_counter = label_counter or LabelCounter()
+
+    def _list_analyses(self, created_after):
+        """
+        List the analyses to check, delete analyses that are no longer eligible from the store.
+        Return the analyses to export, the references of eligible analyses, whether the listing was incremental and
+        the new high water mark.
+        """
+        # Without high water mark all in progress analyses are checked.
+        high_water_mark = None if self.full else self.store.get_state('high_water_mark')
+        new_high_water_mark = self.store.get_state('high_water_mark')
+        if high_water_mark:
+            analyses = self.client.iter_analyses(created_after=created_after, last_updated_after=high_water_mark)
+        else:
+            analyses = self.client.iter_analyses(status='IN_PROGRESS', created_after=created_after)
+
+        pending_analyses = []
+        in_progress_references = set()
+        for analysis in analyses:
+            analysis_reference = analysis['reference']
+            last_updated_on = analysis['lastUpdatedOn']
+            if not new_high_water_mark or last_updated_on > new_high_water_mark:
+                new_high_water_mark = last_updated_on
+
+            # Analyses no longer in progress, without classification tree or PATIENT/INHERITANCE type are removed.
+            if (
+                analysis['status'] != 'IN_PROGRESS' or not analysis['classificationTreeName']
+                or analysis['analysisType'] not in ['PATIENT', 'INHERITANCE']
+            ):
+                self.store.delete([analysis_reference])
+                continue
+            in_progress_references.add(analysis_reference)
+
+            # Skip analyses that did not change since the previous export, also checkpoints of an interrupted run.
+            # Databases imported from tsv files only contain the lastUpdatedOn date.
+            stored_analysis = self.store.get(analysis_reference)
+            if stored_analysis and stored_analysis['last_updated_on'] in [last_updated_on, last_updated_on[0:10]]:
+                continue
+            pending_analyses.append(analysis)
+        return pending_analyses, in_progress_references, bool(high_water_mark), new_high_water_mark
+
+    def _get_analysis_data(self, analyses):
+        """Get the patient or inheritance analysis data of analyses concurrently, return a dict by analysis id."""
+        analysis_data = {}
+        for analysis_type in ['PATIENT', 'INHERITANCE']:
+            ids = [analysis['id'] for analysis in analyses if analysis['analysisType'] == analysis_type]
+            results = self.client.get_analyses_by_ids(
+                ids, analysis_type=analysis_type, max_workers=self.workers, return_exceptions=True
+            )
+            analysis_data.update(zip(ids, results))
+        return analysis_data
+
+    def _count_analysis(self, analysis, analysis_data):
+        """Export and count the variants of an analysis, return the row to store."""
+        analysis_id = analysis['id']
+        analysis_type = analysis['analysisType']
+        mol_var_count = variant_count(analysis_data, 'molecularVariantCount')
+        cnv_count = variant_count(analysis_data, 'copyNumberVariationCount')
+
+        # Stream exports, memory usage does not depend on the number of variants
+        molecular_variants = self.client.export_variants(
+            analysis_type, 'molecular_variant', analysis_id, timeout=self.export_timeout,
+            initial_delay=self.initial_delay, max_not_found_polls=self.max_not_found_polls, stream=True
+        )
+        manual_review_count = self.label_counter.count(molecular_variants)
+        copy_number_variants = self.client.export_variants(
+            analysis_type, 'copy_number_variation', analysis_id, timeout=self.export_timeout,
+            initial_delay=self.initial_delay, max_not_found_polls=self.max_not_found_polls, stream=True
+        )
+        manual_review_count.extend(self.label_counter.count(copy_number_variants))
+
+        return dict(zip(COLUMNS, [
+            analysis['reference'], analysis_type, analysis['analysisPipelineName'], ','.join(analysis['targetPanelNames']),
+            analysis['createdOn'], analysis['lastUpdatedOn'], mol_var_count, cnv_count
+        ] + manual_review_count), analysis_id=analysis_id)
+
+    def run(self, progress=None):
+        """
+        Synchronize the store, return a summary dict with the number of checked and exported analyses and the errors.
+        The high water mark is only advanced when all analyses were exported, failed analyses are retried next run.
+
+        :param progress: Optional callback called with (done, total, eta_seconds, analysis_reference) after every
+                         processed analysis
+        """
+        # Analyses < 1 year old, either all in progress analyses or all analyses updated since the last run.
+        filter_date = one_year_before(datetime.now())
+        created_after = filter_date.strftime('%Y-%m-%dT%H:%M:%S.%f+0000')
+        pending_analyses, in_progress_references, incremental, new_high_water_mark = self._list_analyses(created_after)
+
+        analysis_data = self._get_analysis_data(pending_analyses)
+        errors = []
+        for analysis in pending_analyses:
+            if isinstance(analysis_data[analysis['id']], Exception):
+                errors.append({'analysis_reference': analysis['reference'], 'error': str(analysis_data[analysis['id']])})
+        # Largest analyses first, so a large analysis started last does not delay the end of the run.
+        pending_analyses = sorted(
+            [analysis for analysis in pending_analyses if not isinstance(analysis_data[analysis['id']], Exception)],
+            key=lambda analysis: -variant_count(analysis_data[analysis['id']], 'molecularVariantCount')
+        )
+
+        total = len(pending_analyses)
+        done = 0
+        exported = 0
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self._count_analysis, analysis, analysis_data[analysis['id']]): analysis
+                for analysis in pending_analyses
+            }
+            try:
+                while futures:
+                    completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        analysis = futures.pop(future)
+                        try:
+                            # Store result, committed per analysis so an interrupted run resumes where it stopped.
+                            self.store.upsert(future.result())
+                            exported += 1
+                        # Malformed responses and truncated exports (ValueError) only fail their own analysis.
+                        except (RequestException, ExportTimeoutError, KeyError, TypeError, ValueError) as error:
+                            errors.append({'analysis_reference': analysis['reference'], 'error': str(error)})
+                        done += 1
+                        if progress:
+                            elapsed = time.monotonic() - start
+                            progress(done, total, elapsed / done * (total - done), analysis['reference'])
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        # Remove analyses no longer in progress (full run) or created more than a year ago.
+        if not incremental:
+            self.store.delete(self.store.references() - in_progress_references)
+        self.store.delete_created_before(created_after[0:10])
+        if new_high_water_mark and not errors:
+            self.store.set_state('high_water_mark', new_high_water_mark)
+
+        return {'analyses_checked': len(in_progress_references), 'analyses_exported': exported, 'errors': errors}
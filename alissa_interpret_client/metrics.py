@@ -0,0 +1,320 @@
+from collections import namedtuple
+import bisect
+import re
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Path segments identifying a single resource: numeric ids and (hex) uuids.
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12})$')
+
+Span = namedtuple('Span', ['name', 'start_time', 'end_time', 'attributes', 'error'])
+
+
+def end_point_template(end_point):
+    """
+    Return the template of an end point, ids are replaced by {id}, for example 'analyses/12' becomes 'analyses/{id}'.
+    Used to aggregate metrics per end point instead of per resource.
+
+    :param end_point: end point
+    """
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in end_point.split('/'))
+
+
+def opentelemetry_span_hook(tracer):
+    """
+    Return a span hook that reports spans to an OpenTelemetry tracer, for example trace.get_tracer(__name__).
+
+    :param tracer: OpenTelemetry tracer
+    """
+    def span_hook(span):
+        otel_span = tracer.start_span(span.name, start_time=int(span.start_time * 1e9), attributes=span.attributes)
+        if span.error:
+            otel_span.set_attribute('error.type', span.error)
+        otel_span.end(end_time=int(span.end_time * 1e9))
+    return span_hook
+
+
+class _Histogram(object):
+    """Latency histogram with cumulative export in the Prometheus format."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within the matching bucket, as Prometheus histogram_quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for upper, cumulative in zip(self.buckets, self.cumulative_counts()):
+            if cumulative >= rank:
+                bucket_count = cumulative - previous
+                return round(lower + (upper - lower) * ((rank - previous) / bucket_count if bucket_count else 0), 6)
+            lower, previous = upper, cumulative
+        return self.max  # Quantile falls in the +Inf bucket
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class _RequestStats(object):
+    """Statistics of a single method and end point template."""
+
+    __slots__ = ('statuses', 'errors', 'latency', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, buckets):
+        self.statuses = {}
+        self.errors = 0
+        self.latency = _Histogram(buckets)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def _format_labels(labels):
+    """Format a Prometheus label set, escaping backslashes, quotes and newlines."""
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+
+
+class Metrics(object):
+    """
+    Thread safe request metrics of an AlissaInterpret client: request counts, latency histograms and bytes transferred
+    per end point, retries, export polls and token requests. End points are aggregated by template, for example
+    'patients/{id}'. Export the metrics with prometheus() or summary(), or receive a Span per request with span_hook.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, span_hook=None, prefix='alissa_interpret'):
+        """
+        Construct a new metrics collection.
+
+        :param buckets: Upper bounds in seconds of the latency histogram buckets
+        :param span_hook: Optional callable receiving a Span(name, start_time, end_time, attributes, error) for every
+                          request, token request and export wait, see opentelemetry_span_hook.
+        :param prefix: Prefix of the Prometheus metric names
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.span_hook = span_hook
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Remove all recorded metrics."""
+        with self._lock:
+            self._requests = {}  # (method, end point template): _RequestStats
+            self._retries = {}  # (method, end point template, reason): count
+            self._polls = {}  # (end point template, ready): count
+            self._exports = {}  # end point template: _Histogram of the export wait time
+            self._tokens = {}  # grant: _Histogram
+
+    def _span(self, name, start_time, end_time, attributes, error=None):
+        if self.span_hook:
+            self.span_hook(Span(name, start_time, end_time, attributes, error))
+
+    def record_request(self, method, end_point, status, start_time, duration, bytes_sent=0, bytes_received=0):
+        """
+        Record a completed request.
+
+        :param method: HTTP method
+        :param end_point: end point
+        :param status: Response status code, or None if the request failed without response
+        :param start_time: Request start as unix timestamp
+        :param duration: Seconds until the response body was received, or the response headers for streamed responses
+        :param bytes_sent: Size of the request body
+        :param bytes_received: Size of the response body, the Content-Length for streamed responses
+        """
+        template = end_point_template(end_point)
+        with self._lock:
+            stats = self._requests.get((method, template))
+            if stats is None:
+                stats = self._requests[(method, template)] = _RequestStats(self.buckets)
+            status_label = str(status) if status is not None else 'error'
+            stats.statuses[status_label] = stats.statuses.get(status_label, 0) + 1
+            if status is None or status >= 400:
+                stats.errors += 1
+            stats.latency.observe(duration)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+        attributes = {'http.method': method, 'http.route': template}
+        if status is not None:
+            attributes['http.status_code'] = status
+        self._span(
+            f'{method} {template}', start_time, start_time + duration, attributes,
+            None if status is not None and status < 400 else status_label
+        )
+
+    def record_retry(self, method, end_point, reason):
+        """
+        Record a retried request.
+
+        :param method: HTTP method
+        :param end_point: end point
+        :param reason: Retry reason, the response status code or the exception name
+        """
+        key = (method, end_point_template(end_point), str(reason))
+        with self._lock:
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    def record_poll(self, end_point, ready):
+        """
+        Record an export poll.
+
+        :param end_point: export end point
+        :param ready: True if the export was ready
+        """
+        key = (end_point_template(end_point), bool(ready))
+        with self._lock:
+            self._polls[key] = self._polls.get(key, 0) + 1
+
+    def record_export(self, end_point, start_time, duration, error=None):
+        """
+        Record the time spent waiting until an export was ready.
+
+        :param end_point: export end point
+        :param start_time: Wait start as unix timestamp
+        :param duration: Seconds waited
+        :param error: Optional exception name if waiting failed
+        """
+        template = end_point_template(end_point)
+        with self._lock:
+            histogram = self._exports.get(template)
+            if histogram is None:
+                histogram = self._exports[template] = _Histogram(self.buckets)
+            histogram.observe(duration)
+        self._span('export wait', start_time, start_time + duration, {'http.route': template}, error)
+
+    def record_token(self, grant, start_time, duration, error=None):
+        """
+        Record a token request.
+
+        :param grant: Token grant, password or refresh_token
+        :param start_time: Request start as unix timestamp
+        :param duration: Seconds the token request took
+        :param error: Optional exception name if the request failed
+        """
+        with self._lock:
+            histogram = self._tokens.get(grant)
+            if histogram is None:
+                histogram = self._tokens[grant] = _Histogram(self.buckets)
+            histogram.observe(duration)
+        self._span('token', start_time, start_time + duration, {'oauth.grant_type': grant}, error)
+
+    def summary(self):
+        """Return all metrics as JSON serializable dict, latency quantiles are estimated from the histograms."""
+        with self._lock:
+            requests = []
+            for (method, template), stats in sorted(self._requests.items()):
+                requests.append({
+                    'method': method,
+                    'end_point': template,
+                    'count': stats.latency.count,
+                    'errors': stats.errors,
+                    'statuses': dict(stats.statuses),
+                    'latency': stats.latency.summary(),
+                    'bytes_sent': stats.bytes_sent,
+                    'bytes_received': stats.bytes_received,
+                })
+            return {
+                'requests': requests,
+                'retries': [
+                    {'method': method, 'end_point': template, 'reason': reason, 'count': count}
+                    for (method, template, reason), count in sorted(self._retries.items())
+                ],
+                'export_polls': [
+                    {'end_point': template, 'ready': ready, 'count': count}
+                    for (template, ready), count in sorted(self._polls.items())
+                ],
+                'export_waits': [
+                    dict(end_point=template, **histogram.summary()) for template, histogram in sorted(self._exports.items())
+                ],
+                'tokens': [dict(grant=grant, **histogram.summary()) for grant, histogram in sorted(self._tokens.items())],
+            }
+
+    def _prometheus_histogram(self, lines, name, labels, histogram):
+        for upper, cumulative in zip(self.buckets + ('+Inf',), histogram.cumulative_counts()):
+            lines.append(f'{name}_bucket{{{_format_labels(labels + [("le", upper)])}}} {cumulative}')
+        lines.append(f'{name}_sum{{{_format_labels(labels)}}} {histogram.sum}')
+        lines.append(f'{name}_count{{{_format_labels(labels)}}} {histogram.count}')
+
+    def prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        prefix = self.prefix
+        lines = []
+        with self._lock:
+            requests = sorted(self._requests.items())
+            lines.append(f'# HELP {prefix}_requests_total Number of requests per end point and status.')
+            lines.append(f'# TYPE {prefix}_requests_total counter')
+            for (method, template), stats in requests:
+                for status, count in sorted(stats.statuses.items()):
+                    labels = [('method', method), ('end_point', template), ('status', status)]
+                    lines.append(f'{prefix}_requests_total{{{_format_labels(labels)}}} {count}')
+
+            lines.append(
+                f'# HELP {prefix}_request_duration_seconds Latency until the response body, or the headers when streamed.'
+            )
+            lines.append(f'# TYPE {prefix}_request_duration_seconds histogram')
+            for (method, template), stats in requests:
+                labels = [('method', method), ('end_point', template)]
+                self._prometheus_histogram(lines, f'{prefix}_request_duration_seconds', labels, stats.latency)
+
+            for direction in ('sent', 'received'):
+                lines.append(f'# HELP {prefix}_request_bytes_{direction}_total Number of body bytes {direction}.')
+                lines.append(f'# TYPE {prefix}_request_bytes_{direction}_total counter')
+                for (method, template), stats in requests:
+                    labels = [('method', method), ('end_point', template)]
+                    value = stats.bytes_sent if direction == 'sent' else stats.bytes_received
+                    lines.append(f'{prefix}_request_bytes_{direction}_total{{{_format_labels(labels)}}} {value}')
+
+            lines.append(f'# HELP {prefix}_retries_total Number of retried requests per end point and reason.')
+            lines.append(f'# TYPE {prefix}_retries_total counter')
+            for (method, template, reason), count in sorted(self._retries.items()):
+                labels = [('method', method), ('end_point', template), ('reason', reason)]
+                lines.append(f'{prefix}_retries_total{{{_format_labels(labels)}}} {count}')
+
+            lines.append(f'# HELP {prefix}_export_polls_total Number of export polls per end point.')
+            lines.append(f'# TYPE {prefix}_export_polls_total counter')
+            for (template, ready), count in sorted(self._polls.items()):
+                labels = [('end_point', template), ('ready', str(ready).lower())]
+                lines.append(f'{prefix}_export_polls_total{{{_format_labels(labels)}}} {count}')
+
+            lines.append(f'# HELP {prefix}_export_wait_seconds Time waited until an export was ready.')
+            lines.append(f'# TYPE {prefix}_export_wait_seconds histogram')
+            for template, histogram in sorted(self._exports.items()):
+                self._prometheus_histogram(lines, f'{prefix}_export_wait_seconds', [('end_point', template)], histogram)
+
+            lines.append(f'# HELP {prefix}_token_request_duration_seconds Token request latency per grant.')
+            lines.append(f'# TYPE {prefix}_token_request_duration_seconds histogram')
+            for grant, histogram in sorted(self._tokens.items()):
+                self._prometheus_histogram(lines, f'{prefix}_token_request_duration_seconds', [('grant', grant)], histogram)
+        return '\n'.join(lines) + '\n'
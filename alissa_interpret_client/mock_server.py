@@ -0,0 +1,469 @@
+from datetime import datetime, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+
+from .metrics import end_point_template
+
+API_PREFIX = '/interpret/api/2/'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.000+0000'
+VARIANT_LABELS = (
+    'Y,Manual review', 'N,Benign', 'Y2,Manual review', 'N,Likely benign;Population frequency', 'Y3 (rare),Manual review',
+    'N,Benign',
+)
+
+
+def make_analysis(id):
+    """
+    Return a generated analysis, odd ids are patient analyses and even ids inheritance analyses.
+    Analyses are created up to 4 weeks ago and last updated a day later.
+    """
+    analysis_type = 'PATIENT' if id % 2 else 'INHERITANCE'
+    created_on = datetime.utcnow().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(days=id % 28 + 1)
+    return {
+        'id': id,
+        'reference': f'{"P" if analysis_type == "PATIENT" else "I"}{id:06d}',
+        'analysisType': analysis_type,
+        'status': 'IN_PROGRESS' if id % 5 else 'COMPLETED',
+        'analysisPipelineName': 'Exome pipeline',
+        'targetPanelNames': ['Exome', 'Cardio'],
+        'classificationTreeName': 'UMCU classification tree',
+        'createdOn': created_on.strftime(DATE_FORMAT),
+        'lastUpdatedOn': (created_on + timedelta(days=1, seconds=id)).strftime(DATE_FORMAT),
+    }
+
+
+def make_variant(index):
+    """Return a generated variant."""
+    return {
+        'id': index,
+        'chromosome': str(index % 22 + 1),
+        'start': 10000 + index * 10,
+        'end': 10000 + index * 10,
+        'reference': 'A',
+        'alternative': 'G',
+        'geneSymbol': f'GENE{index % 500}',
+        'markedForReview': index % 10 == 0,
+        'markedIncludeInReport': False,
+        'classificationTreeLabelsScore': {'labels': VARIANT_LABELS[index % len(VARIANT_LABELS)], 'score': index % 7},
+    }
+
+
+class _MockExport(object):
+    """
+    Export requested on the mock server, ready after polls_before_ready polls and latency seconds.
+    Only the markedForReview criterion is applied, other criteria are kept but ignored.
+    """
+
+    __slots__ = ('ready_at', 'polls_left', 'variant_count', 'criteria')
+
+    def __init__(self, latency, polls_before_ready, variant_count, criteria):
+        self.ready_at = time.monotonic() + latency
+        self.polls_left = polls_before_ready
+        self.variant_count = variant_count
+        self.criteria = criteria
+
+    @property
+    def marked_review(self):
+        return bool(self.criteria.get('markedForReview'))
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    """Route requests to the MockAlissaServer."""
+
+    protocol_version = 'HTTP/1.1'  # Keep connections alive, as the Alissa server does
+    disable_nagle_algorithm = True  # Headers and body are written separately, do not wait for delayed ACKs
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass  # Client closed a kept alive connection
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, status_code, content, headers=None):
+        body = content if isinstance(content, bytes) else json.dumps(content).encode('utf-8')
+        if status_code == 200 and self.command == 'GET' and self.server.mock.validators:
+            headers = dict(headers or {}, **self.server.mock.response_validators(body))
+            if self.server.mock.not_modified(self.headers, headers):
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        body = self._read_body()
+        self.server.mock.handle(self, method, body)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+class MockAlissaServer(object):
+    """
+    Local stand-in for the Alissa Interpret public API, used to test and benchmark the client without an Alissa server.
+    Implements the OAuth2 token end point, analyses, patients, lab results, data file uploads and the asynchronous
+    variant export lifecycle. Get responses carry ETag and Last-Modified validators and conditional requests are
+    answered with 304 Not Modified. Request counts per end point template are kept in request_counts.
+    """
+
+    def __init__(
+        self, analysis_count=100, export_variant_count=1000, export_polls=1, export_latency=0, latency=0,
+        token_expires_in=3600, username='username', password='password', validators=('ETag', 'Last-Modified'),
+        host='127.0.0.1', port=0
+    ):
+        """
+        Construct a new mock Alissa server, start it with start() or use it as context manager.
+
+        :param analysis_count: Number of generated analyses
+        :param export_variant_count: Number of variants in an export, a dict maps analysis ids to variant counts
+        :param export_polls: Number of polls an export is not ready, a dict maps analysis ids to numbers of polls
+        :param export_latency: Seconds an export is not ready after it was requested
+        :param latency: Seconds added to every request
+        :param token_expires_in: Token lifetime in seconds
+        :param username: Accepted account name
+        :param password: Accepted account password
+        :param validators: Validator headers of get responses, ETag and/or Last-Modified. Last-Modified is the time a
+                           response body was first sent.
+        :param host: Host to listen on
+        :param port: Port to listen on, 0 selects a free port
+        """
+        self.export_variant_count = export_variant_count
+        self.export_polls = export_polls
+        self.export_latency = export_latency
+        self.latency = latency
+        self.token_expires_in = token_expires_in
+        self.username = username
+        self.password = password
+        self.validators = validators
+        self.analyses = [make_analysis(id) for id in range(1, analysis_count + 1)]
+        self.patients = []
+        self.lab_results = []
+        self.data_files = []
+        self.exports = {}
+        self.malformed_exports = set()  # analysis ids of which exports are truncated halfway
+        self.tokens = set()
+        self.refresh_tokens = set()
+        self.request_counts = {}  # (method, end point template): count
+        self._first_sent = {}  # ETag: unix time a response body was first sent
+        self._failures = {}  # (method, end point template): list of (status code, headers) responses to send first
+        self._export_bodies = {}  # (variant count, marked review): encoded export
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), _MockRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._routes = [
+            ('GET', re.compile(r'^analyses$'), self._get_analyses),
+            ('GET', re.compile(r'^analyses/(\d+)$'), self._get_analysis),
+            ('GET', re.compile(r'^(patient|inheritance)_analyses/(\d+)$'), self._get_typed_analysis),
+            ('POST', re.compile(r'^(patient|inheritance)_analyses/(\d+)/(molecular_variants|copy_number_variations)/exports$'),
+             self._post_export),
+            ('GET', re.compile(r'^(patient|inheritance)_analyses/(\d+)/(molecular_variants|copy_number_variations)/exports/'
+                               r'([\w-]+)$'), self._get_export),
+            ('GET', re.compile(r'^patients$'), self._get_patients),
+            ('POST', re.compile(r'^patients$'), self._post_patient),
+            ('GET', re.compile(r'^patients/(\d+)$'), self._get_patient),
+            ('GET', re.compile(r'^patients/(\d+)/lab_results$'), self._get_patient_lab_results),
+            ('POST', re.compile(r'^patients/(\d+)/lab_results$'), self._post_lab_result),
+            ('GET', re.compile(r'^lab_results/(\d+)$'), self._get_lab_result),
+            ('GET', re.compile(r'^data_files$'), self._get_data_files),
+            ('POST', re.compile(r'^data_files$'), self._post_data_file),
+            ('GET', re.compile(r'^data_files/(\d+)$'), self._get_data_file),
+        ]
+
+    @property
+    def base_uri(self):
+        """Base uri of the mock server, pass as base_uri to AlissaInterpret."""
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving requests."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def revoke_tokens(self):
+        """Revoke all issued access tokens, the next request of a client is rejected with 401."""
+        with self._lock:
+            self.tokens.clear()
+
+    def fail_requests(self, method, end_point, status_code, count=1, retry_after=None):
+        """
+        Fail the next requests to an end point template with an error response, for example a 503 to test retries.
+
+        :param method: HTTP method
+        :param end_point: end point template, for example 'analyses/{id}'
+        :param status_code: Response status code
+        :param count: Number of requests to fail
+        :param retry_after: Optional Retry-After header value
+        """
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        with self._lock:
+            self._failures.setdefault((method, end_point), []).extend([(status_code, headers)] * count)
+
+    def response_validators(self, body):
+        """Return the validator headers of a get response body."""
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self._lock:
+            first_sent = self._first_sent.setdefault(etag, int(time.time()))
+        validators = {'ETag': etag, 'Last-Modified': formatdate(first_sent, usegmt=True)}
+        return {name: value for name, value in validators.items() if name in self.validators}
+
+    def not_modified(self, request_headers, validators):
+        """Check whether the conditional request headers match the response validators, If-None-Match takes precedence."""
+        if request_headers.get('If-None-Match') and 'ETag' in validators:
+            return validators['ETag'] in [etag.strip() for etag in request_headers['If-None-Match'].split(',')]
+        if request_headers.get('If-Modified-Since') and 'Last-Modified' in validators:
+            try:
+                since = parsedate_to_datetime(request_headers['If-Modified-Since'])
+            except (TypeError, ValueError):
+                return False
+            return parsedate_to_datetime(validators['Last-Modified']) <= since
+        return False
+
+    def request_count(self, method, end_point):
+        """
+        Return the number of requests to an end point template.
+
+        :param method: HTTP method
+        :param end_point: end point template, for example 'analyses/{id}' or 'oauth/token'
+        """
+        return self.request_counts.get((method, end_point), 0)
+
+    def handle(self, handler, method, body):
+        """Handle a request, called by the request handler thread."""
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(handler.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/auth/oauth/token' and method == 'POST':
+            self._count(method, 'oauth/token')
+            return self._post_token(handler, {key: values[-1] for key, values in parse_qs(body.decode('utf-8')).items()})
+        if not url.path.startswith(API_PREFIX):
+            return handler.send_json(404, {'error': 'Not found'})
+
+        end_point = url.path[len(API_PREFIX):]
+        self._count(method, end_point_template(end_point))
+        authorization = handler.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or authorization[len('Bearer '):] not in self.tokens:
+            return handler.send_json(401, {'error': 'invalid_token'})
+        with self._lock:
+            failures = self._failures.get((method, end_point_template(end_point)))
+            failure = failures.pop(0) if failures else None
+        if failure:
+            return handler.send_json(failure[0], {'error': 'Injected failure'}, failure[1])
+
+        for route_method, pattern, route in self._routes:
+            match = pattern.match(end_point)
+            if match and route_method == method:
+                return route(handler, params, body, *match.groups())
+        return handler.send_json(404, {'error': 'Not found'})
+
+    def _count(self, method, end_point):
+        with self._lock:
+            self.request_counts[(method, end_point)] = self.request_counts.get((method, end_point), 0) + 1
+
+    def _new_token(self):
+        token = {
+            'access_token': uuid.uuid4().hex,
+            'refresh_token': uuid.uuid4().hex,
+            'token_type': 'bearer',
+            'expires_in': self.token_expires_in,
+        }
+        with self._lock:
+            self.tokens.add(token['access_token'])
+            self.refresh_tokens.add(token['refresh_token'])
+        return token
+
+    def _post_token(self, handler, form):
+        grant_type = form.get('grant_type')
+        if grant_type == 'password':
+            if form.get('username') != self.username or form.get('password') != self.password:
+                return handler.send_json(401, {'error': 'invalid_grant'})
+        elif grant_type == 'refresh_token':
+            if not handler.headers.get('Authorization', '').startswith('Basic '):
+                return handler.send_json(401, {'error': 'invalid_client'})
+            with self._lock:
+                if form.get('refresh_token') not in self.refresh_tokens:
+                    return handler.send_json(400, {'error': 'invalid_grant'})
+                self.refresh_tokens.discard(form['refresh_token'])
+        else:
+            return handler.send_json(400, {'error': 'unsupported_grant_type'})
+        handler.send_json(200, self._new_token())
+
+    def _listing(self, handler, items, params, filters=()):
+        """Send a listing, filtered on equal field values and paged when the page and pageSize params are set."""
+        for name in filters:
+            if name in params:
+                items = [item for item in items if str(item.get(name)) == params[name]]
+        if 'lastUpdatedAfter' in params:
+            items = [item for item in items if item.get('lastUpdatedOn', '') > params['lastUpdatedAfter']]
+        if 'createdAfter' in params:
+            items = [item for item in items if item.get('createdOn', '') > params['createdAfter']]
+        if 'page' in params and 'pageSize' in params:
+            page, page_size = int(params['page']), int(params['pageSize'])
+            items = items[page * page_size:(page + 1) * page_size]
+        handler.send_json(200, items)
+
+    def _find(self, handler, items, id):
+        for item in items:
+            if item['id'] == int(id):
+                handler.send_json(200, item)
+                return
+        handler.send_json(404, {'error': 'Not found'})
+
+    def _get_analyses(self, handler, params, body):
+        self._listing(handler, self.analyses, params, ('status', 'analysisType', 'reference'))
+
+    def _get_analysis(self, handler, params, body, id):
+        self._find(handler, self.analyses, id)
+
+    def _get_typed_analysis(self, handler, params, body, analysis_type, id):
+        for analysis in self.analyses:
+            if analysis['id'] == int(id) and analysis['analysisType'].lower() == analysis_type:
+                variant_count = self._variant_count(analysis['id'])
+                return handler.send_json(200, dict(analysis, labResults=[{
+                    'analysisVariantCount': {'molecularVariantCount': variant_count, 'copyNumberVariationCount': 0}
+                }]))
+        handler.send_json(404, {'error': 'Not found'})
+
+    def _variant_count(self, analysis_id):
+        if isinstance(self.export_variant_count, dict):
+            return self.export_variant_count.get(analysis_id, 0)
+        return self.export_variant_count
+
+    def _post_export(self, handler, params, body, analysis_type, id, variant_type):
+        criteria = json.loads(body or b'{}')
+        export_id = uuid.uuid4().hex
+        variant_count = self._variant_count(int(id)) if variant_type == 'molecular_variants' else 0
+        with self._lock:
+            export_polls = self.export_polls.get(int(id), 0) if isinstance(self.export_polls, dict) else self.export_polls
+            self.exports[export_id] = _MockExport(self.export_latency, export_polls, variant_count, criteria)
+        handler.send_json(200, {'exportId': export_id})
+
+    def _export_body(self, export):
+        """Return the encoded export, generated once per export size to keep the server fast during benchmarks."""
+        key = (export.variant_count, export.marked_review)
+        if key not in self._export_bodies:
+            variants = (make_variant(index) for index in range(export.variant_count))
+            if export.marked_review:
+                variants = (variant for variant in variants if variant['markedForReview'])
+            self._export_bodies[key] = json.dumps(list(variants)).encode('utf-8')
+        return self._export_bodies[key]
+
+    def _get_export(self, handler, params, body, analysis_type, id, variant_type, export_id):
+        with self._lock:
+            export = self.exports.get(export_id)
+            if export is None:
+                return handler.send_json(404, {'error': 'Not found'})
+            if export.polls_left > 0 or time.monotonic() < export.ready_at:
+                export.polls_left -= 1
+                return handler.send_json(202, {'status': 'Export not ready'})
+        body = self._export_body(export)
+        if int(id) in self.malformed_exports:
+            body = body[:len(body) // 2]
+        handler.send_json(200, body)
+
+    def _get_patients(self, handler, params, body):
+        self._listing(handler, self.patients, params, ('accessionNumber', 'familyIdentifier'))
+
+    def _post_patient(self, handler, params, body):
+        patient = json.loads(body)
+        with self._lock:
+            if any(existing['accessionNumber'] == patient.get('accessionNumber') for existing in self.patients):
+                return handler.send_json(409, {'error': 'Patient already exists'})
+            patient['id'] = next(self._ids)
+            self.patients.append(patient)
+        handler.send_json(200, patient)
+
+    def _get_patient(self, handler, params, body, id):
+        self._find(handler, self.patients, id)
+
+    def _get_patient_lab_results(self, handler, params, body, patient_id):
+        handler.send_json(200, [lab_result for lab_result in self.lab_results if lab_result['patientId'] == int(patient_id)])
+
+    def _post_lab_result(self, handler, params, body, patient_id):
+        lab_result = dict(json.loads(body), patientId=int(patient_id))
+        with self._lock:
+            lab_result['id'] = next(self._ids)
+            self.lab_results.append(lab_result)
+        handler.send_json(200, lab_result)
+
+    def _get_lab_result(self, handler, params, body, id):
+        self._find(handler, self.lab_results, id)
+
+    def _get_data_files(self, handler, params, body):
+        self._listing(handler, self.data_files, params, ('name', 'type'))
+
+    def _post_data_file(self, handler, params, body):
+        """Store a multipart/form-data upload, uploadSize and uploadMd5 describe the content of the uploaded file."""
+        boundary = re.search(r'boundary=([^;]+)', handler.headers.get('Content-Type', ''))
+        match = re.search(rb'filename="([^"]*)"', body[:4096])
+        head_end = body.find(b'\r\n\r\n')
+        tail = f'\r\n--{boundary.group(1)}--\r\n'.encode('utf-8') if boundary else None
+        if not boundary or not match or head_end == -1 or not body.endswith(tail):
+            return handler.send_json(400, {'error': 'Malformed multipart body'})
+        content = body[head_end + 4:-len(tail)]
+        with self._lock:
+            data_file = {
+                'id': next(self._ids),
+                'name': match.group(1).decode('utf-8'),
+                'type': params.get('type'),
+                'uploadSize': len(content),
+                'uploadMd5': hashlib.md5(content).hexdigest(),
+            }
+            self.data_files.append(data_file)
+        handler.send_json(200, data_file)
+
+    def _get_data_file(self, handler, params, body, id):
+        self._find(handler, self.data_files, id)
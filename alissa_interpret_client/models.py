@@ -0,0 +1,236 @@
+from collections.abc import Mapping
+from datetime import datetime
+
+from . import utils
+
+# Date formats used by the Alissa Interpret api, for example 2021-03-01T10:15:00.000+0000.
+DATE_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z')
+
+
+def parse_datetime(value):
+    """
+    Parse an Alissa Interpret date to a timezone aware datetime.
+
+    :param value: date string
+    """
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f'Unknown date format: {value}')
+
+
+class Field(object):
+    """
+    Model attribute reading a camel case field of the response. The value is decoded on first access and cached,
+    fields that are never accessed are never decoded.
+    """
+
+    __slots__ = ('key', 'decode', 'name')
+
+    def __init__(self, key, decode=None):
+        """
+        Construct a new model field.
+
+        :param key: camel case field name in the response
+        :param decode: Optional callable decoding the value, for example parse_datetime or a model class
+        """
+        self.key = key
+        self.decode = decode
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._data.get(self.key)
+        if self.decode is None or value is None:
+            return value
+        if instance._decoded is None:
+            instance._decoded = {}
+        elif self.name in instance._decoded:
+            return instance._decoded[self.name]
+        decoded = instance._decoded[self.name] = self.decode(value)
+        return decoded
+
+
+def model_list(model_class):
+    """Return a decode function converting a list of response dicts to a list of model_class instances."""
+    def decode(values):
+        return [model_class(value) for value in values]
+    return decode
+
+
+class Model(Mapping):
+    """
+    Read-only typed view on a decoded response dict. Declared fields are available as snake case attributes, other
+    fields are looked up by converting the attribute name to camel case. Models are slotted, the only state is the
+    response dict and the decoded values of accessed fields. Indexing with the camel case field name returns the raw
+    value, so models can be used wherever response dicts are expected.
+    """
+
+    __slots__ = ('_data', '_decoded')
+
+    def __init__(self, data):
+        """
+        Construct a new model.
+
+        :param data: decoded response dict
+        """
+        self._data = data
+        self._decoded = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        key = utils.snake_to_camel_case(name)
+        if key not in self._data:
+            raise AttributeError(f'{type(self).__name__} has no field {key}')
+        return self._data[key]
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, Model):
+            return type(self) is type(other) and self._data == other._data
+        return self._data == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        id = self._data.get('id')
+        return f'{type(self).__name__}(id={id!r})' if id is not None else f'{type(self).__name__}({self._data!r})'
+
+    def to_dict(self):
+        """Return the response dict."""
+        return self._data
+
+
+class AnalysisVariantCount(Model):
+    """Number of variants of a lab result in an analysis."""
+
+    __slots__ = ()
+
+    molecular_variant_count = Field('molecularVariantCount')
+    copy_number_variation_count = Field('copyNumberVariationCount')
+
+
+class LabResult(Model):
+    """Lab result, a sample in a data file linked to a patient."""
+
+    __slots__ = ()
+
+    id = Field('id')
+    patient_id = Field('patientId')
+    data_file_id = Field('dataFileId')
+    sample_identifier = Field('sampleIdentifier')
+    analysis_variant_count = Field('analysisVariantCount', AnalysisVariantCount)
+
+
+class Analysis(Model):
+    """Patient or inheritance analysis."""
+
+    __slots__ = ()
+
+    id = Field('id')
+    reference = Field('reference')
+    analysis_type = Field('analysisType')
+    status = Field('status')
+    analysis_pipeline_name = Field('analysisPipelineName')
+    target_panel_names = Field('targetPanelNames')
+    classification_tree_name = Field('classificationTreeName')
+    created_on = Field('createdOn', parse_datetime)
+    last_updated_on = Field('lastUpdatedOn', parse_datetime)
+    lab_results = Field('labResults', model_list(LabResult))
+
+
+class Patient(Model):
+    """Patient."""
+
+    __slots__ = ()
+
+    id = Field('id')
+    accession_number = Field('accessionNumber')
+    family_identifier = Field('familyIdentifier')
+    gender = Field('gender')
+    folder_name = Field('folderName')
+    comments = Field('comments')
+    created_on = Field('createdOn', parse_datetime)
+    last_updated_on = Field('lastUpdatedOn', parse_datetime)
+
+
+class DataFile(Model):
+    """Uploaded data file, for example a vcf file."""
+
+    __slots__ = ()
+
+    id = Field('id')
+    name = Field('name')
+    type = Field('type')
+    upload_size = Field('uploadSize')
+    upload_md5 = Field('uploadMd5')
+    created_on = Field('createdOn', parse_datetime)
+
+
+class ClassificationTreeLabelsScore(Model):
+    """Labels and score assigned to a variant by the classification tree."""
+
+    __slots__ = ()
+
+    labels = Field('labels')
+    score = Field('score')
+
+
+class ExportRecord(Model):
+    """Variant of a molecular variant or copy number variation export."""
+
+    __slots__ = ()
+
+    id = Field('id')
+    chromosome = Field('chromosome')
+    start = Field('start')
+    end = Field('end')
+    reference = Field('reference')
+    alternative = Field('alternative')
+    gene_symbol = Field('geneSymbol')
+    marked_for_review = Field('markedForReview')
+    marked_include_in_report = Field('markedIncludeInReport')
+    classification_tree_labels_score = Field('classificationTreeLabelsScore', ClassificationTreeLabelsScore)
+
+
+# Model classes of end point responses, end points not listed are returned as dicts.
+END_POINT_MODELS = {
+    'analyses': Analysis,
+    'analyses/{id}': Analysis,
+    'patient_analyses/{id}': Analysis,
+    'inheritance_analyses/{id}': Analysis,
+    'patients': Patient,
+    'patients/{id}': Patient,
+    'patients/{id}/lab_results': LabResult,
+    'lab_results/{id}': LabResult,
+    'data_files': DataFile,
+    'data_files/{id}': DataFile,
+    '{analyses}/{id}/{variant_type}/exports/{export_id}': ExportRecord,
+}
+
+
+def to_models(model_class, data):
+    """
+    Wrap a decoded response in model_class, a listing is returned as a list of models.
+
+    :param model_class: Model subclass
+    :param data: decoded response, a dict or a list of dicts
+    """
+    if isinstance(data, list):
+        return [model_class(item) for item in data]
+    return model_class(data)
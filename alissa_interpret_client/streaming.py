@@ -0,0 +1,61 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a JSON array from an iterable of byte chunks and yield the array items one by one.
+    Only the item being parsed is kept in memory, independent of the size of the array.
+
+    :param chunks: Iterable of bytes, for example response.iter_content()
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    state = 'start'  # start, value_or_end, value, separator, end
+    chunks = iter(chunks)
+
+    while state != 'end':
+        chunk = next(chunks, None)
+        eof = chunk is None
+        buffer = buffer[position:] + decoder.decode(chunk or b'', final=eof)
+        position = 0
+
+        while state != 'end':
+            while position < len(buffer) and buffer[position] in _whitespace:
+                position += 1
+            if position == len(buffer):
+                break
+
+            character = buffer[position]
+            if state == 'start':
+                if character != '[':
+                    raise ValueError(f'Expected JSON array, found {character!r}.')
+                position += 1
+                state = 'value_or_end'
+            elif state == 'separator' or (state == 'value_or_end' and character == ']'):
+                if character == ']':
+                    state = 'end'
+                elif character == ',':
+                    state = 'value'
+                else:
+                    raise ValueError(f'Expected , or ] in JSON array, found {character!r}.')
+                position += 1
+            else:
+                try:
+                    item, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # Incomplete item, read next chunk.
+                if end == len(buffer) and not eof:
+                    break  # Item may continue in the next chunk, for example a number.
+                position = end
+                state = 'separator'
+                yield item
+
+        if eof and state != 'end':
+            raise ValueError('Incomplete JSON array.')
@@ -0,0 +1,182 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, fall back to thread locking only.
+    fcntl = None
+
+
+def token_cache_key(base_uri, client_id, username):
+    """
+    Return the cache key for a token, unique per Alissa server, client and user account.
+
+    :param base_uri: Base uri for the Alissa server
+    :param client_id: client id received from Agilent
+    :param username: account name of the Alissa user account
+    """
+    return hashlib.sha256(f'{base_uri}|{client_id}|{username}'.encode('utf-8')).hexdigest()
+
+
+def token_is_valid(token, margin=0):
+    """
+    Check whether a token is present and does not expire within margin seconds.
+    The margin is capped at half the token lifetime, tokens without expiry information are assumed to be valid.
+
+    :param token: OAuth2 token dictionary
+    :param margin: Number of seconds before expiry at which a token is considered expired
+    """
+    if not token or 'access_token' not in token:
+        return False
+    expires_at = token.get('expires_at')
+    if expires_at is None:
+        return True
+    if token.get('expires_in'):
+        margin = min(margin, float(token['expires_in']) / 2)
+    return float(expires_at) - margin > time.time()
+
+
+class MemoryTokenCache(object):
+    """In-memory token cache, shared between clients within a single process."""
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """
+        Get a token from the cache, return None if not cached.
+
+        :param key: token cache key
+        """
+        with self._lock:
+            return self._tokens.get(key)
+
+    def set(self, key, token):
+        """
+        Store a token in the cache.
+
+        :param key: token cache key
+        :param token: OAuth2 token dictionary
+        """
+        with self._lock:
+            self._tokens[key] = dict(token)
+
+    def delete(self, key):
+        """
+        Remove a token from the cache.
+
+        :param key: token cache key
+        """
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Lock the cache while a token is fetched, so only one token request is done at a time.
+
+        :param key: token cache key
+        """
+        with self._lock:
+            yield
+
+
+class FileTokenCache(object):
+    """
+    File backed token cache, shared between processes on the same machine.
+    The cache file is only readable for the current user, concurrent access is serialized with a lock file.
+    """
+
+    def __init__(self, path):
+        """
+        Construct a new file backed token cache.
+
+        :param path: path to the token cache file, created if it does not exist
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, ValueError):  # Missing or corrupt cache, start over.
+            return {}
+
+    def _write(self, tokens):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.token_cache')
+        try:
+            os.chmod(temp_path, 0o600)
+            with os.fdopen(file_descriptor, 'w') as temp_file:
+                json.dump(tokens, temp_file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, key):
+        """
+        Get a token from the cache, return None if not cached.
+
+        :param key: token cache key
+        """
+        return self._read().get(key)
+
+    def set(self, key, token):
+        """
+        Store a token in the cache.
+
+        :param key: token cache key
+        :param token: OAuth2 token dictionary
+        """
+        with self.lock(key):
+            tokens = self._read()
+            tokens[key] = dict(token)
+            self._write(tokens)
+
+    def delete(self, key):
+        """
+        Remove a token from the cache.
+
+        :param key: token cache key
+        """
+        with self.lock(key):
+            tokens = self._read()
+            if tokens.pop(key, None) is not None:
+                self._write(tokens)
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Lock the cache file while a token is fetched, so only one process requests a new token at a time.
+
+        :param key: token cache key
+        """
+        with self._lock:
+            # Nested locks within this process already hold the file lock.
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f'{self.path}.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
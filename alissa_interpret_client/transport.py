@@ -0,0 +1,148 @@
+from email.utils import parsedate_to_datetime
+import random
+import socket
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectTimeout, ConnectionError, ReadTimeout
+from urllib3.connection import HTTPConnection
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter enabling TCP keep-alive, so idle pooled connections are not silently dropped by firewalls."""
+
+    def __init__(self, keepalive_idle=60, keepalive_interval=10, keepalive_count=6, **kwargs):
+        """
+        Construct a new keep-alive HTTP adapter.
+
+        :param keepalive_idle: Seconds a connection is idle before keep-alive probes are send
+        :param keepalive_interval: Seconds between keep-alive probes
+        :param keepalive_count: Number of failed probes before the connection is closed
+        :param kwargs: HTTPAdapter arguments, for example pool_connections and pool_maxsize
+        """
+        self.socket_options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        # TCP keep-alive tuning options are platform dependent.
+        for option, value in [
+            ('TCP_KEEPIDLE', keepalive_idle), ('TCP_KEEPINTVL', keepalive_interval), ('TCP_KEEPCNT', keepalive_count)
+        ]:
+            if hasattr(socket, option):
+                self.socket_options.append((socket.IPPROTO_TCP, getattr(socket, option), value))
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+class RetryPolicy(object):
+    """Retry policy for transient request errors, using exponential backoff with jitter."""
+
+    idempotent_methods = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+    def __init__(
+        self, total=3, backoff_factor=0.5, max_backoff=30, jitter=0.5, status_forcelist=(429, 502, 503, 504),
+        post_status_forcelist=(429, 503)
+    ):
+        """
+        Construct a new retry policy.
+
+        :param total: Maximum number of retries per request, 0 disables retries
+        :param backoff_factor: Backoff in seconds before the first retry, doubled for every next retry
+        :param max_backoff: Maximum backoff in seconds, also caps the server requested Retry-After
+        :param jitter: Fraction of the backoff that is randomized, spreads retries of concurrent clients
+        :param status_forcelist: Response status codes retried for idempotent requests
+        :param post_status_forcelist: Response status codes retried for non idempotent requests,
+                                      limited to status codes indicating the request was not processed.
+        """
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_forcelist = frozenset(status_forcelist)
+        self.post_status_forcelist = frozenset(post_status_forcelist)
+
+    def is_retryable_status(self, method, status_code):
+        """
+        Check whether a response status code should be retried.
+
+        :param method: HTTP method
+        :param status_code: HTTP response status code
+        """
+        if method.upper() in self.idempotent_methods:
+            return status_code in self.status_forcelist
+        return status_code in self.post_status_forcelist
+
+    def is_retryable_error(self, method, error):
+        """
+        Check whether a request exception should be retried.
+        Connect timeouts are always retried, other connection errors only for idempotent requests.
+
+        :param method: HTTP method
+        :param error: requests exception
+        """
+        if isinstance(error, ConnectTimeout):
+            return True
+        return method.upper() in self.idempotent_methods and isinstance(error, (ConnectionError, ReadTimeout))
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Return the number of seconds to wait before the next retry.
+
+        :param attempt: Number of retries done so far
+        :param retry_after: Optional Retry-After header value, takes precedence over the exponential backoff
+        """
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+
+        backoff = min(self.backoff_factor * 2 ** attempt, self.max_backoff)
+        return backoff - random.uniform(0, backoff * self.jitter)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value, either delay seconds or a HTTP date. Return None if not parsable.
+
+    :param value: Retry-After header value
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter(object):
+    """Thread safe token bucket rate limiter."""
+
+    def __init__(self, rate, burst=1):
+        """
+        Construct a new rate limiter.
+
+        :param rate: Maximum number of requests per second, None disables rate limiting
+        :param burst: Maximum number of requests allowed at once after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request is allowed."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
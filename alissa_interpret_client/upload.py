@@ -0,0 +1,92 @@
+import os
+import time
+import uuid
+
+
+class MultipartFileStream(object):
+    """
+    File-like multipart/form-data request body, reading a file from disk in binary chunks while it is send.
+    The complete body is never held in memory and the file is uploaded as is, for example a gzip compressed vcf.
+    """
+
+    def __init__(self, path, field_name='file', content_type=None, progress=None):
+        """
+        Construct a new multipart file stream.
+
+        :param path: path to file
+        :param field_name: Form field name of the file
+        :param content_type: Optional content type of the file part
+        :param progress: Optional callback called with (bytes_send, total_bytes, elapsed_seconds) while uploading
+        """
+        self.path = path
+        self.boundary = uuid.uuid4().hex
+        self.progress = progress
+
+        filename = os.path.basename(path).replace('"', '\\"')
+        head = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+        if content_type:
+            head += f'Content-Type: {content_type}\r\n'
+        self._head = f'{head}\r\n'.encode('utf-8')
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        self._file_size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        self._position = 0
+        self._start_time = None
+
+    @property
+    def content_type(self):
+        """Content-Type header of the request."""
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Rewind the stream, only seeking to the start is supported."""
+        if offset != 0 or whence != os.SEEK_SET:
+            raise OSError('MultipartFileStream only supports seeking to the start.')
+        self._file.seek(0)
+        self._position = 0
+        self._start_time = None
+        return 0
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes of the request body.
+
+        :param size: Maximum number of bytes, -1 reads the remaining body
+        """
+        if self._start_time is None:
+            self._start_time = time.monotonic()
+        if size is None or size < 0:
+            size = len(self) - self._position
+
+        data = b''
+        head_size = len(self._head)
+        if self._position < head_size:
+            data += self._head[self._position:self._position + size]
+        if len(data) < size and self._position + len(data) < head_size + self._file_size:
+            data += self._file.read(size - len(data))
+        tail_position = self._position + len(data) - head_size - self._file_size
+        if len(data) < size and tail_position >= 0:
+            data += self._tail[tail_position:tail_position + size - len(data)]
+
+        self._position += len(data)
+        if self.progress and data:
+            self.progress(
+                min(max(self._position - head_size, 0), self._file_size), self._file_size,
+                time.monotonic() - self._start_time
+            )
+        return data
+
+    def close(self):
+        self._file.close()
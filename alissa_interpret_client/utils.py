@@ -16,3 +16,16 @@ def kwargs_to_dict(**kwargs):
         if value:
             dictionary[snake_to_camel_case(key)] = value
     return dictionary
+
+
+def rewind_body(data=None, files=None):
+    """
+    Seek file objects in a request body back to the start, so the body can be send again.
+
+    :param data: Optional request data, rewound when it is a file-like object
+    :param files: Optional requests files dictionary
+    """
+    for value in [data] + list((files or {}).values()):
+        file = value[1] if isinstance(value, tuple) else value
+        if hasattr(file, 'seek'):
+            file.seek(0)
@@ -0,0 +1,130 @@
+from collections import namedtuple
+import hashlib
+import json
+import sqlite3
+import time
+
+from .models import Model
+
+# Changes since the previous export: added and changed variants, keys of removed variants and number of unchanged variants.
+VariantDiff = namedtuple('VariantDiff', ['added', 'changed', 'removed', 'unchanged'])
+
+
+def variant_hash(variant):
+    """Return a content hash of a variant dict or ExportRecord, independent of the order of the fields."""
+    content = json.dumps(variant, sort_keys=True, separators=(',', ':'), default=_model_to_dict)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _model_to_dict(value):
+    """JSON default function encoding models, such as ExportRecord, as their response dict."""
+    if isinstance(value, Model):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def variant_key(variant, content_hash):
+    """Return the identity of a variant: its id, or the content hash for variants without id."""
+    id = variant.get('id')
+    return str(id) if id is not None else content_hash
+
+
+class VariantSnapshotStore(object):
+    """
+    SQLite store of the content hash of every exported variant per analysis and variant type, used to compare an export
+    with the previous export of the same analysis. Only hashes are stored, not the variants.
+    """
+
+    def __init__(self, path):
+        """
+        Open or create a variant snapshot store.
+
+        :param path: path to the SQLite database file
+        """
+        self.connection = sqlite3.connect(path, timeout=30)
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS variants (analysis_type TEXT, variant_type TEXT, analysis_id INTEGER, '
+                'variant_key TEXT, content_hash TEXT, '
+                'PRIMARY KEY (analysis_type, variant_type, analysis_id, variant_key)) WITHOUT ROWID'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS snapshots (analysis_type TEXT, variant_type TEXT, analysis_id INTEGER, '
+                'exported_at REAL, variant_count INTEGER, PRIMARY KEY (analysis_type, variant_type, analysis_id))'
+            )
+
+    def close(self):
+        self.connection.close()
+
+    def hashes(self, analysis_type, variant_type, analysis_id):
+        """Return a dict mapping variant keys to content hashes of the previous export, empty if there is none."""
+        return dict(self.connection.execute(
+            'SELECT variant_key, content_hash FROM variants WHERE analysis_type = ? AND variant_type = ? AND analysis_id = ?',
+            (analysis_type, variant_type, analysis_id)
+        ))
+
+    def snapshot(self, analysis_type, variant_type, analysis_id):
+        """Return (exported_at, variant_count) of the previous export, or None if the analysis was not exported."""
+        return self.connection.execute(
+            'SELECT exported_at, variant_count FROM snapshots '
+            'WHERE analysis_type = ? AND variant_type = ? AND analysis_id = ?',
+            (analysis_type, variant_type, analysis_id)
+        ).fetchone()
+
+    def replace(self, analysis_type, variant_type, analysis_id, hashes):
+        """
+        Replace the stored export of an analysis in a single transaction.
+
+        :param hashes: dict mapping variant keys to content hashes
+        """
+        key = (analysis_type, variant_type, analysis_id)
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM variants WHERE analysis_type = ? AND variant_type = ? AND analysis_id = ?', key
+            )
+            self.connection.executemany(
+                'INSERT INTO variants (analysis_type, variant_type, analysis_id, variant_key, content_hash) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [key + item for item in hashes.items()]
+            )
+            self.connection.execute(
+                'INSERT OR REPLACE INTO snapshots (analysis_type, variant_type, analysis_id, exported_at, variant_count) '
+                'VALUES (?, ?, ?, ?, ?)',
+                key + (time.time(), len(hashes))
+            )
+
+    def diff(self, analysis_type, variant_type, analysis_id, variants, key=None, update=True):
+        """
+        Compare variants with the previous export of the analysis, return a VariantDiff.
+        The variants are consumed one by one, only added and changed variants are kept in memory.
+        All variants are reported as added when the analysis was not exported before.
+
+        :param analysis_type: Analysis type, PATIENT or INHERITANCE
+        :param variant_type: Variant type, molecular_variant or copy_number_variation
+        :param analysis_id: analysis id
+        :param variants: Iterable of variant dicts, for example export_variants(..., stream=True)
+        :param key: Optional callable returning the identity of a variant, defaults to the id or the content hash
+        :param update: Store the variants as the new previous export
+        """
+        previous_hashes = self.hashes(analysis_type, variant_type, analysis_id)
+        hashes = {}
+        added = []
+        changed = []
+        unchanged = 0
+        for variant in variants:
+            content_hash = variant_hash(variant)
+            variant_id = str(key(variant)) if key else variant_key(variant, content_hash)
+            hashes[variant_id] = content_hash
+            previous_hash = previous_hashes.get(variant_id)
+            if previous_hash is None:
+                added.append(variant)
+            elif previous_hash != content_hash:
+                changed.append(variant)
+            else:
+                unchanged += 1
+        removed = [variant_id for variant_id in previous_hashes if variant_id not in hashes]
+
+        if update:
+            self.replace(analysis_type, variant_type, analysis_id, hashes)
+        return VariantDiff(added, changed, removed, unchanged)
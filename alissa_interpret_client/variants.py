@@ -0,0 +1,170 @@
+from array import array
+from collections.abc import Mapping
+import functools
+import json
+import operator
+
+
+def get_field(variant, field):
+    """
+    Get a field from a variant, nested fields are separated by dots, for example 'classificationTreeLabelsScore.labels'.
+    Return None if the field is missing.
+
+    :param variant: variant dict or ExportRecord
+    :param field: field name
+    """
+    value = variant
+    for key in field.split('.'):
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(key)
+    return value
+
+
+def variant_filter(criteria):
+    """
+    Return a predicate matching variants on field values, for example {'chromosome': '1', 'geneSymbol': ['BRCA1', 'BRCA2']}.
+    A list, tuple or set matches any of its values, a callable is called with the field value and should return a bool.
+
+    :param criteria: dict mapping field names, nested fields separated by dots, to values
+    """
+    checks = []
+    for field, value in criteria.items():
+        if callable(value):
+            checks.append((field, value))
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            checks.append((field, frozenset(value).__contains__))
+        else:
+            checks.append((field, functools.partial(operator.eq, value)))
+
+    def predicate(variant):
+        return all(check(get_field(variant, field)) for field, check in checks)
+    return predicate
+
+
+def _compact_column(values):
+    """Store a column of only integers or only floats as typed array, other columns as list."""
+    if values and all(type(value) is int for value in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if values and all(type(value) is float for value in values):
+        return array('d', values)
+    return values
+
+
+class VariantTable(object):
+    """
+    Compact columnar container for selected fields of a variant export.
+    Only the selected fields are kept, repeated strings such as chromosome, gene and labels are stored once and
+    integer or float columns are stored as typed arrays.
+    """
+
+    __slots__ = ('fields', 'columns')
+
+    def __init__(self, fields, columns):
+        """
+        Construct a new variant table, use VariantTable.from_variants to create a table from an export.
+
+        :param fields: field names
+        :param columns: dict mapping each field name to a list or array of values
+        """
+        self.fields = list(fields)
+        self.columns = columns
+
+    @classmethod
+    def from_variants(cls, variants, fields):
+        """
+        Create a variant table from variants, consuming a (streamed) export one variant at a time.
+
+        :param variants: Iterable of variant dicts
+        :param fields: field names to keep, nested fields are separated by dots
+        """
+        values = {field: [] for field in fields}
+        interned = {field: {} for field in fields}
+        for variant in variants:
+            for field in fields:
+                value = get_field(variant, field)
+                if isinstance(value, str):
+                    value = interned[field].setdefault(value, value)
+                elif isinstance(value, (list, dict)):
+                    value = json.dumps(value)  # Nested values are not typed, keep a hashable JSON representation
+                    value = interned[field].setdefault(value, value)
+                values[field].append(value)
+        return cls(fields, {field: _compact_column(values[field]) for field in fields})
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def __iter__(self):
+        return self.rows()
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def rows(self):
+        """Yield each variant as dict of the selected fields."""
+        for values in zip(*[self.columns[field] for field in self.fields]):
+            yield dict(zip(self.fields, values))
+
+    def take(self, indices):
+        """
+        Return a new variant table containing the variants at indices.
+
+        :param indices: Iterable of variant indices
+        """
+        indices = list(indices)
+        columns = {}
+        for field, column in self.columns.items():
+            selected = [column[index] for index in indices]
+            columns[field] = array(column.typecode, selected) if isinstance(column, array) else selected
+        return VariantTable(self.fields, columns)
+
+    def where(self, field, value):
+        """
+        Return a new variant table containing the variants where field equals value.
+
+        :param field: field name
+        :param value: value to match
+        """
+        return self.take(index for index, column_value in enumerate(self.columns[field]) if column_value == value)
+
+    def where_in(self, field, values):
+        """
+        Return a new variant table containing the variants where field is one of values.
+
+        :param field: field name
+        :param values: values to match
+        """
+        values = set(values)
+        return self.take(index for index, column_value in enumerate(self.columns[field]) if column_value in values)
+
+    def contains(self, field, substring, case_sensitive=False):
+        """
+        Return a new variant table containing the variants where the text of field contains substring.
+        Each distinct value is checked once.
+
+        :param field: field name
+        :param substring: substring to match
+        :param case_sensitive: Match case sensitive
+        """
+        if not case_sensitive:
+            substring = substring.lower()
+        matches = {}
+        indices = []
+        for index, value in enumerate(self.columns[field]):
+            if value not in matches:
+                text = value if isinstance(value, str) else ''
+                matches[value] = substring in (text if case_sensitive else text.lower())
+            if matches[value]:
+                indices.append(index)
+        return self.take(indices)
+
+    def filter(self, predicate):
+        """
+        Return a new variant table containing the variants for which predicate returns True.
+
+        :param predicate: Callable receiving a variant dict of the selected fields
+        """
+        return self.take(index for index, row in enumerate(self.rows()) if predicate(row))
@@ -0,0 +1,136 @@
+"""benchmark_client.py - measures throughput and latency of the client against a local MockAlissaServer.
+    Benchmarks: paging through analyses, export round trips, large export parsing and vcf upload.
+    Store results with --output and compare a later run with --baseline to catch performance regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from alissa_interpret_client.alissa_interpret import AlissaInterpret
+from alissa_interpret_client.mock_server import MockAlissaServer
+
+
+def measure(function, repeat):
+    """
+    Run function repeat times after a warm up run, return a dict with the latency statistics in seconds and the result.
+    The warm up run opens connections, fetches the token and lets the server generate the export data.
+    """
+    result = function()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return {
+        'repeat': repeat,
+        'mean': statistics.mean(durations),
+        'min': durations[0],
+        'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+    }, result
+
+
+def benchmark_listing(client, args):
+    stats, analyses = measure(lambda: sum(1 for _ in client.iter_analyses(page_size=args.page_size)), args.repeat)
+    stats['items_per_second'] = analyses / stats['mean']
+    return stats
+
+
+def benchmark_export_round_trip(client, args):
+    stats, _ = measure(
+        lambda: client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.001, max_delay=0.01),
+        args.repeat * 5
+    )
+    return stats
+
+
+def benchmark_large_export(client, args):
+    results = {}
+    for name, stream in [('large_export', False), ('large_export_stream', True)]:
+        stats, variant_count = measure(
+            lambda: sum(1 for _ in client.export_variants(
+                'PATIENT', 'molecular_variant', 3, initial_delay=0.001, max_delay=0.01, stream=stream
+            )),
+            args.repeat
+        )
+        stats['variants_per_second'] = variant_count / stats['mean']
+        results[name] = stats
+    return results
+
+
+def benchmark_upload(client, args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vcf_file = os.path.join(tmp_dir, 'benchmark.vcf.gz')
+        with open(vcf_file, 'wb') as output:
+            for _ in range(args.upload_size):
+                output.write(os.urandom(1024 * 1024))
+        stats, _ = measure(lambda: client.post_data_file(vcf_file, 'VCF_FILE'), args.repeat)
+    stats['megabytes_per_second'] = args.upload_size / stats['mean']
+    return stats
+
+
+def compare(results, baseline, max_regression):
+    """Print the change of the mean latency per benchmark, return the names of benchmarks slower than max_regression."""
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        change = stats['mean'] / baseline[name]['mean'] - 1
+        print(f'{name}\t{change:+.1%}', file=sys.stderr)
+        if change > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--analyses', type=int, default=5000, help='Number of analyses listed')
+    parser.add_argument('--page_size', type=int, default=100, help='Page size used to list analyses')
+    parser.add_argument('--export_variants', type=int, default=200000, help='Number of variants in the large export')
+    parser.add_argument('--upload_size', type=int, default=50, help='Size of the uploaded vcf file in megabytes')
+    parser.add_argument('--latency', type=float, default=0, help='Seconds added to every request by the server')
+    parser.add_argument('--json_backend', help='JSON backend used to decode responses, orjson, ujson or json')
+    parser.add_argument('--models', action='store_true', help='Return typed models instead of dicts')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs per benchmark')
+    parser.add_argument('--output', help='Write the results to a JSON file')
+    parser.add_argument('--baseline', help='Compare with the results of an earlier run, exit 1 on regression')
+    parser.add_argument(
+        '--max_regression', type=float, default=0.2, help='Maximum allowed increase of the mean latency, default 0.2'
+    )
+    args = parser.parse_args()
+
+    os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'  # The mock server uses http
+    server = MockAlissaServer(
+        analysis_count=args.analyses, export_variant_count={1: 100, 3: args.export_variants}, export_polls=2,
+        latency=args.latency
+    )
+    with server:
+        client = AlissaInterpret(
+            server.base_uri, 'client_id', 'client_secret', server.username, server.password,
+            json_backend=args.json_backend, models=args.models
+        )
+        results = {
+            'listing': benchmark_listing(client, args),
+            'export_round_trip': benchmark_export_round_trip(client, args),
+            'upload': benchmark_upload(client, args),
+        }
+        results.update(benchmark_large_export(client, args))
+
+    print('benchmark\tmean\tmin\tp95\tthroughput')
+    for name, stats in results.items():
+        throughput = ', '.join(f'{stats[key]:.0f} {key}' for key in stats if key.endswith('per_second'))
+        print(f'{name}\t{stats["mean"]:.4f}\t{stats["min"]:.4f}\t{stats["p95"]:.4f}\t{throughput}')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.max_regression)
+        if regressions:
+            print(f'Performance regression: {", ".join(regressions)}', file=sys.stderr)
+            sys.exit(1)
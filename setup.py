@@ -25,6 +25,10 @@ setuptools.setup(
     ],
     packages=setuptools.find_packages(),
     install_requires=requirements,
+    extras_require={
+        'arrow': ['pyarrow>=7.0.0'],
+        'orjson': ['orjson>=3.6.0'],
+    },
     entry_points={
         'console_scripts': ['alissa_client=alissa_interpret_client.cli:main'],
     }
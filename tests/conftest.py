@@ -0,0 +1,35 @@
+import pytest
+
+from alissa_interpret_client.alissa_interpret import AlissaInterpret
+from alissa_interpret_client.mock_server import MockAlissaServer
+
+
+@pytest.fixture
+def server_options():
+    """Keyword arguments of the MockAlissaServer, override this fixture in a test module to configure the server."""
+    return {}
+
+
+@pytest.fixture
+def server(request, server_options, monkeypatch):
+    """
+    Running MockAlissaServer configured with server_options. Parametrize indirectly with a dict to override options
+    of a single test, for example @pytest.mark.parametrize('server', [{'export_polls': 0}], indirect=True).
+    """
+    monkeypatch.setenv('OAUTHLIB_INSECURE_TRANSPORT', '1')  # The mock server uses http
+    with MockAlissaServer(**dict(server_options, **getattr(request, 'param', {}))) as server:
+        yield server
+
+
+@pytest.fixture
+def client_class():
+    """Client class constructed by create_client, override in a test module to test another client."""
+    return AlissaInterpret
+
+
+@pytest.fixture
+def create_client(server, client_class):
+    """Return a factory of clients of client_class logged in on the mock server, keyword arguments are passed on."""
+    def create_client(**kwargs):
+        return client_class(server.base_uri, 'client_id', 'client_secret', 'username', 'password', **kwargs)
+    return create_client
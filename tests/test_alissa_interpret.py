@@ -0,0 +1,267 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
+import pytest
+from requests.exceptions import HTTPError
+
+from alissa_interpret_client.cache import MemoryResponseCache
+from alissa_interpret_client.exports import ExportTimeoutError, PollSchedule
+from alissa_interpret_client.metrics import Metrics
+from alissa_interpret_client.models import Analysis, ExportRecord
+from alissa_interpret_client.token_cache import MemoryTokenCache
+from alissa_interpret_client.transport import RetryPolicy
+from alissa_interpret_client.variant_diff import VariantSnapshotStore
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=250, export_variant_count=500, export_polls=2)
+
+
+def test_token_reuse_and_renewal(server, create_client):
+    token_cache = MemoryTokenCache()
+    client = create_client(token_cache=token_cache)
+    create_client(token_cache=token_cache)
+    assert server.request_count('POST', 'oauth/token') == 1
+
+    server.revoke_tokens()
+    assert client.get_analysis(1)['id'] == 1
+    assert server.request_count('GET', 'analyses/{id}') == 2  # Rejected request is retried with a new token
+    assert server.request_count('POST', 'oauth/token') == 2
+
+
+def test_retries(server, create_client):
+    # The backoff is long, Retry-After: 0 of the server takes precedence
+    client = create_client(retry_policy=RetryPolicy(total=3, backoff_factor=60))
+    server.fail_requests('GET', 'analyses/{id}', 503, count=2, retry_after=0)
+    server.fail_requests('GET', 'analyses/{id}', 429, retry_after=0)
+    assert client.get_analysis(1)['id'] == 1
+    assert server.request_count('GET', 'analyses/{id}') == 4
+
+    # Non idempotent requests are only retried on status codes indicating the request was not processed
+    server.fail_requests('POST', 'patients', 429, retry_after=0)
+    assert client.post_patient('accession', 'family', 'Female', 'folder', '')['accessionNumber'] == 'accession'
+    assert server.request_count('POST', 'patients') == 2
+    server.fail_requests('POST', 'patients', 502, retry_after=0)
+    with pytest.raises(HTTPError) as error:
+        client.post_patient('accession', 'family', 'Female', 'folder', '')
+    assert error.value.response.status_code == 502
+    assert server.request_count('POST', 'patients') == 3
+    assert len(server.patients) == 1
+
+
+def test_retries_exhausted(server, create_client):
+    client = create_client(retry_policy=RetryPolicy(total=2, backoff_factor=0.001))
+    server.fail_requests('GET', 'analyses/{id}', 503, count=5)
+    with pytest.raises(HTTPError) as error:
+        client.get_analysis(1)
+    assert error.value.response.status_code == 503
+    assert server.request_count('GET', 'analyses/{id}') == 3
+
+    client = create_client(retry_policy=RetryPolicy(total=0))
+    with pytest.raises(HTTPError):
+        client.get_analysis(1)
+    assert server.request_count('GET', 'analyses/{id}') == 4
+
+
+def test_analyses(server, create_client):
+    client = create_client()
+    assert len(client.get_analyses()) == 250
+    assert [analysis['id'] for analysis in client.iter_analyses(page_size=100)] == list(range(1, 251))
+    assert server.request_count('GET', 'analyses') == 4
+    assert client.get_patient_analyses(1)['analysisType'] == 'PATIENT'
+    assert client.get_inheritance_analyses(2)['analysisType'] == 'INHERITANCE'
+
+
+def test_export_variants(server, create_client):
+    client = create_client()
+    variants = client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01)
+    assert len(variants) == 500
+    assert server.request_count('GET', 'patient_analyses/{id}/molecular_variants/exports/{id}') == 3
+
+    variants = client.export_variants(
+        'INHERITANCE', 'molecular_variant', 2, marked_review=True, initial_delay=0.01, stream=True
+    )
+    assert [variant['id'] for variant in variants] == list(range(0, 500, 10))
+
+    table = client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, fields=['id', 'chromosome'])
+    assert len(table) == 500
+
+    with pytest.raises(ExportTimeoutError):
+        server.export_latency = 10
+        client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, timeout=0.1)
+
+
+def test_export_not_found(server, create_client):
+    # A wrong export id fails after a few polls instead of polling until the timeout
+    client = create_client()
+    end_point = 'patient_analyses/1/molecular_variants/exports/unknown'
+    with pytest.raises(HTTPError) as error:
+        client._wait_for_export(end_point, PollSchedule(initial_delay=0.001, max_not_found_polls=2))
+    assert error.value.response.status_code == 404
+    assert server.request_count('GET', 'patient_analyses/{id}/molecular_variants/exports/unknown') == 3
+
+    # Servers reporting long running exports as not found need more not found polls
+    export_end_point = 'patient_analyses/{id}/molecular_variants/exports/{id}'
+    server.export_polls = 0
+    server.fail_requests('GET', export_end_point, 404, count=5)
+    with pytest.raises(HTTPError):
+        client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.001)
+    assert len(client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.001, max_not_found_polls=5)) == 500
+    server.fail_requests('GET', export_end_point, 409, count=10)
+    assert len(client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.001, max_not_found_polls=None)) == 500
+
+
+def test_patients_and_lab_results(tmp_path, create_client):
+    client = create_client()
+    patient = client.post_patient('accession', 'family', 'Female', 'folder', '')
+    assert client.get_patient(patient['id'])['accessionNumber'] == 'accession'
+    assert [patient['accessionNumber'] for patient in client.iter_patients()] == ['accession']
+
+    vcf_file = tmp_path / 'test.vcf'
+    vcf_file.write_text('##fileformat=VCFv4.2\n')
+    data_file = client.post_data_file(str(vcf_file), 'VCF_FILE')
+    assert data_file['name'] == 'test.vcf'
+    assert data_file['type'] == 'VCF_FILE'
+
+    lab_result = client.post_lab_result(patient['id'], data_file['id'], 'sample')
+    assert client.get_lab_results(patient['id']) == [lab_result]
+
+
+def test_response_cache(server, create_client):
+    client = create_client(cache=MemoryResponseCache())
+    assert client.get_analysis(1) == client.get_analysis(1)
+    assert server.request_count('GET', 'analyses/{id}') == 1
+
+
+@pytest.mark.parametrize(
+    'server', [{'validators': ('ETag', 'Last-Modified')}, {'validators': ('Last-Modified',)}], indirect=True
+)
+def test_response_cache_revalidation(server, create_client):
+    # Expired responses are revalidated with a conditional request, a 304 response reuses and refreshes the entry
+    request_metrics = Metrics()
+    response_cache = MemoryResponseCache()
+    client = create_client(cache=response_cache, cache_ttls={'analyses/{id}': 0}, metrics=request_metrics)
+    analysis = client.get_analysis(1)
+    assert client.get_analysis(1) == analysis
+    assert client.get_analysis(1) == analysis
+    [request] = request_metrics.summary()['requests']
+    assert request['statuses'] == {'200': 1, '304': 2}
+
+    [entry] = response_cache._entries.values()
+    assert entry.etag == server.response_validators(entry.content).get('ETag')
+    assert entry.last_modified == server.response_validators(entry.content)['Last-Modified']
+
+    if 'ETag' in server.validators:  # Last-Modified has a resolution of a second, changes within a second are missed
+        server.analyses[0]['status'] = 'CANCELLED'
+        assert client.get_analysis(1)['status'] == 'CANCELLED'
+        assert request_metrics.summary()['requests'][0]['statuses'] == {'200': 2, '304': 2}
+
+
+def test_response_cache_invalidation(server, create_client):
+    # Posts invalidate the cached responses of the end point and its parent resource
+    client = create_client(cache=MemoryResponseCache(), cache_ttls={'patients': 300, 'patients/{id}/lab_results': 300})
+    assert client.get_patients() == []
+    patient = client.post_patient('accession', 'family', 'Female', 'folder', '')
+    assert client.get_patients() == [patient]
+    assert client.get_patients() == [patient]
+    assert server.request_count('GET', 'patients') == 2
+
+    assert client.get_lab_results(patient['id']) == []
+    lab_result = client.post_lab_result(patient['id'], 1, 'sample')
+    assert client.get_lab_results(patient['id']) == [lab_result]
+    assert server.request_count('GET', 'patients/{id}/lab_results') == 2
+
+
+def test_get_by_ids(server, create_client):
+    client = create_client()
+    assert [analysis['id'] for analysis in client.get_analyses_by_ids([5, 3, 5, 1])] == [5, 3, 5, 1]
+    assert server.request_count('GET', 'analyses/{id}') == 3
+    analyses = client.get_analyses_by_ids([1, 2], analysis_type='PATIENT', return_exceptions=True)
+    assert analyses[0]['id'] == 1
+    assert isinstance(analyses[1], HTTPError)
+    with pytest.raises(HTTPError):
+        client.get_analyses_by_ids([1, 2], analysis_type='PATIENT')  # Analysis 2 is an inheritance analysis
+    assert client.get_patients_by_ids([]) == []
+
+    # Concurrent calls for the same patient share a single request
+    patient = client.post_patient('accession', 'family', 'Female', 'folder', '')
+    server.latency = 0.2
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda ids: client.get_patients_by_ids(ids), [[patient['id']]] * 4))
+    assert [result[0]['accessionNumber'] for result in results] == ['accession'] * 4
+    assert server.request_count('GET', 'patients/{id}') == 1
+
+
+def test_export_variants_filters(server, tmp_path, create_client):
+    client = create_client()
+    variants = client.export_variants(
+        'PATIENT', 'molecular_variant', 1, initial_delay=0.01, gene_symbol='GENE1', min_score=0, include_filtered=False,
+        max_depth=None,
+        where={'geneSymbol': 'GENE1', 'chromosome': ['2', '3']}
+    )
+    assert [variant['id'] for variant in variants] == [1]
+    assert [export.criteria for export in server.exports.values()] == [
+        {'markedForReview': False, 'markedIncludeInReport': False, 'geneSymbol': 'GENE1', 'minScore': 0,
+         'includeFiltered': False}
+    ]
+    variants = client.export_variants(
+        'PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True, where=lambda variant: variant['id'] < 3
+    )
+    assert [variant['id'] for variant in variants] == [0, 1, 2]
+
+    snapshot_store = VariantSnapshotStore(str(tmp_path / 'snapshots.sqlite'))
+    assert len(client.export_variants_diff('PATIENT', 'molecular_variant', 1, snapshot_store, initial_delay=0.01).added) == 500
+    server.export_variant_count = 400
+    diff = client.export_variants_diff('PATIENT', 'molecular_variant', 1, snapshot_store, initial_delay=0.01)
+    assert (diff.added, diff.changed, len(diff.removed), diff.unchanged) == ([], [], 100, 400)
+    snapshot_store.close()
+
+
+@pytest.mark.parametrize('json_backend', ['json', None])
+def test_models(json_backend, create_client):
+    client = create_client(json_backend=json_backend, models=True)
+    analysis = client.get_analysis(5)
+    assert isinstance(analysis, Analysis)
+    assert analysis.status == 'COMPLETED'
+    assert client.get_patient_analyses(5).lab_results[0].analysis_variant_count.molecular_variant_count == 500
+    assert [analysis.id for analysis in client.iter_analyses(page_size=100)] == list(range(1, 251))
+    assert all(isinstance(analysis, Analysis) for analysis in client.get_analyses_by_ids([1, 2]))
+    patient = client.post_patient('ACC1', 'FAM1', 'FEMALE', 'folder', '')
+    assert (patient.accession_number, client.get_patient(patient.id).folder_name) == ('ACC1', 'folder')
+
+    variants = client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, marked_review=True)
+    assert all(isinstance(variant, ExportRecord) and variant.marked_for_review for variant in variants)
+    variants = client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+    assert sum(1 for variant in variants if variant.classification_tree_labels_score.labels) == 500
+
+
+def test_post_data_files(server, tmp_path, create_client):
+    client = create_client(pool_maxsize=4)
+    files = []
+    for index in range(6):
+        vcf_file = tmp_path / f'sample{index}.vcf.gz'
+        vcf_file.write_bytes(os.urandom(100000 * (index + 1)))
+        files.append(str(vcf_file))
+    progress = []
+
+    data_files = client.post_data_files(files, 'VCF_FILE', workers=4, progress=lambda *args: progress.append(args))
+    assert [data_file['name'] for data_file in data_files] == [os.path.basename(file) for file in files]
+    for file, data_file in zip(files, data_files):
+        with open(file, 'rb') as vcf_file:
+            content = vcf_file.read()
+        assert data_file['uploadSize'] == len(content)
+        assert data_file['uploadMd5'] == hashlib.md5(content).hexdigest()
+    assert {args[0] for args in progress} == set(files)
+
+    # A missing file fails, the other files are uploaded
+    files.insert(2, str(tmp_path / 'missing.vcf.gz'))
+    with pytest.raises(OSError):
+        client.post_data_files(files, 'VCF_FILE')
+    data_files = client.post_data_files(files, 'VCF_FILE', return_exceptions=True)
+    assert isinstance(data_files[2], OSError)
+    assert [data_file['name'] for data_file in data_files[:2] + data_files[3:]] == ['sample0.vcf.gz', 'sample1.vcf.gz'] + [
+        f'sample{index}.vcf.gz' for index in range(2, 6)
+    ]
+    assert len(server.data_files) == 18
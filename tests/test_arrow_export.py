@@ -0,0 +1,85 @@
+import pytest
+
+from alissa_interpret_client import arrow_export
+from alissa_interpret_client.mock_server import make_variant
+from alissa_interpret_client.models import ExportRecord
+
+pyarrow = pytest.importorskip('pyarrow')
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+def variants(count):
+    return (
+        {'chromosome': str(index % 3), 'start': index, 'info': None if index < 2 else {'depth': index}}
+        for index in range(count)
+    )
+
+
+def test_write_variants_parquet(tmp_path):
+    path = str(tmp_path / 'variants.parquet')
+    assert arrow_export.write_variants(variants(10), path, batch_size=2) == 10
+
+    table = pyarrow.parquet.read_table(path)
+    assert table.num_rows == 10
+    assert table.column('start').to_pylist() == list(range(10))
+    assert table.column('info').to_pylist()[2] == '{"depth": 2}'  # Field without values in the first batch
+
+
+def test_write_variants_arrow_partitioned(tmp_path):
+    path = tmp_path / 'variants'
+    assert arrow_export.write_variants(variants(25), str(path), format='arrow', rows_per_file=10) == 25
+
+    assert sorted(file.name for file in path.iterdir()) == ['part-00000.arrow', 'part-00001.arrow', 'part-00002.arrow']
+    with pyarrow.memory_map(str(path / 'part-00002.arrow')) as source:
+        assert pyarrow.ipc.open_file(source).read_all().column('start').to_pylist() == list(range(20, 25))
+
+
+def test_write_variants_rows_per_file(tmp_path):
+    # rows_per_file is not a multiple of batch_size, files never exceed rows_per_file
+    path = tmp_path / 'variants'
+    assert arrow_export.write_variants(variants(60), str(path), rows_per_file=25, batch_size=10) == 60
+
+    files = sorted(path.iterdir())
+    assert [file.name for file in files] == ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet']
+    tables = [pyarrow.parquet.read_table(str(file)) for file in files]
+    assert [table.num_rows for table in tables] == [25, 25, 10]
+    assert [start for table in tables for start in table.column('start').to_pylist()] == list(range(60))
+
+
+def test_write_variants_invalid(tmp_path):
+    assert arrow_export.write_variants([], str(tmp_path / 'empty.parquet')) == 0
+    assert not (tmp_path / 'empty.parquet').exists()
+    with pytest.raises(ValueError):
+        arrow_export.write_variants([], str(tmp_path / 'variants.csv'), format='csv')
+
+
+def test_write_variants_schema_drift(tmp_path):
+    rows = [{'a': 1, 'b': None}] * 3
+    original = [dict(row) for row in rows]
+    with pytest.raises(ValueError, match='Field a'):
+        arrow_export.write_variants(rows + [{'a': 1.5, 'b': 'x'}], str(tmp_path / 'float.parquet'), batch_size=3)
+    with pytest.raises(ValueError, match='Field c'):
+        arrow_export.write_variants(rows + [{'a': 2, 'c': 3}], str(tmp_path / 'new_field.parquet'), batch_size=3)
+    with pytest.raises(ValueError, match='Field info'):
+        arrow_export.write_variants(
+            [{'info': {'depth': 1}}, {'info': {'depth': 2, 'quality': 30}}], str(tmp_path / 'nested.parquet'), batch_size=1
+        )
+
+    # Missing fields, integers in floating point fields and text fields holding JSON are accepted
+    path = str(tmp_path / 'variants.parquet')
+    batches = rows + [{'a': 2}, {'a': 3, 'b': {'depth': 10}}]
+    assert arrow_export.write_variants(batches, path, batch_size=3) == 5
+    assert pyarrow.parquet.read_table(path).to_pylist()[3:] == [{'a': 2, 'b': None}, {'a': 3, 'b': '{"depth": 10}'}]
+    assert rows == original  # Variants of the caller are not modified
+
+    schema = pyarrow.schema([('a', pyarrow.float64()), ('b', pyarrow.string()), ('c', pyarrow.int64())])
+    batches = rows + [{'a': 1.5, 'b': 'x', 'c': 3}]
+    assert arrow_export.write_variants(batches, path, batch_size=3, schema=schema) == 4
+    assert pyarrow.parquet.read_table(path).to_pylist()[3] == {'a': 1.5, 'b': 'x', 'c': 3}
+
+
+def test_write_variants_models(tmp_path):
+    path = str(tmp_path / 'variants.parquet')
+    assert arrow_export.write_variants((ExportRecord(make_variant(index)) for index in range(5)), path) == 5
+    assert pyarrow.parquet.read_table(path).column('geneSymbol').to_pylist() == [f'GENE{index}' for index in range(5)]
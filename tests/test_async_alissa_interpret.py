@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from requests.exceptions import HTTPError
+
+from alissa_interpret_client.async_alissa_interpret import AsyncAlissaInterpret
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=30, export_variant_count=2500, export_polls=1)
+
+
+@pytest.fixture
+def client_class():
+    return AsyncAlissaInterpret
+
+
+def test_concurrency_limit(create_client):
+    active = []
+    max_active = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            active.append(1)
+            max_active.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+
+    async def main():
+        async with create_client(max_concurrency=3) as client:
+            await asyncio.gather(*[client.run(request) for _ in range(12)])
+    asyncio.run(main())
+    assert max(max_active) == 3
+
+
+def test_get_methods_and_errors(create_client):
+    async def main():
+        async with create_client(max_concurrency=5) as client:
+            analyses = await asyncio.gather(*[client.get_analysis(id) for id in range(1, 31)])
+            assert [analysis['id'] for analysis in analyses] == list(range(1, 31))
+
+            with pytest.raises(HTTPError):
+                await client.get_analysis(100)
+            results = await asyncio.gather(client.get_analysis(1), client.get_analysis(100), return_exceptions=True)
+            assert results[0]['id'] == 1
+            assert isinstance(results[1], HTTPError) and results[1].response.status_code == 404
+    asyncio.run(main())
+
+
+def test_iter_and_export_variants(server, create_client):
+    async def main():
+        async with create_client() as client:
+            assert [analysis['id'] async for analysis in client.iter_analyses(page_size=7)] == list(range(1, 31))
+
+            exports = await asyncio.gather(*[
+                client.export_variants(analysis_type, 'molecular_variant', id, initial_delay=0.01)
+                for id, analysis_type in [(1, 'PATIENT'), (2, 'INHERITANCE'), (3, 'PATIENT')]
+            ])
+            assert [len(variants) for variants in exports] == [2500, 2500, 2500]
+
+            variants = await client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+            assert [variant['id'] async for variant in variants] == list(range(2500))
+
+            with pytest.raises(ValueError):
+                await client.export_variants('OTHER', 'molecular_variant', 1)
+            server.malformed_exports.add(1)
+            variants = await client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+            with pytest.raises(ValueError):
+                async for _ in variants:
+                    pass
+    asyncio.run(main())
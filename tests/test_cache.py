@@ -0,0 +1,60 @@
+import pytest
+
+from alissa_interpret_client import cache
+
+
+def test_cache_key():
+    assert cache.cache_key('patients/1') == 'patients/1'
+    assert cache.cache_key('patients', {'b': 2, 'a': 1}) == 'patients?a=1&b=2'
+
+
+def test_compile_end_point_templates():
+    compiled_ttls = cache.compile_end_point_templates({'patients/{id}': 10, 'analyses/{id}/sources': 20})
+    assert [ttl for pattern, ttl in compiled_ttls if pattern.match('patients/1')] == [10]
+    assert [ttl for pattern, ttl in compiled_ttls if pattern.match('analyses/1/sources')] == [20]
+    assert not [ttl for pattern, ttl in compiled_ttls if pattern.match('patients/1/lab_results')]
+    assert not [ttl for pattern, ttl in compiled_ttls if pattern.match('patients')]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def response_cache(request, tmp_path):
+    if request.param == 'memory':
+        return cache.MemoryResponseCache()
+    return cache.SQLiteResponseCache(str(tmp_path / 'cache.sqlite'))
+
+
+def test_response_cache(response_cache):
+    entry = cache.CacheEntry(b'{"id": 1}', '"etag"', None, 1.0)
+    assert response_cache.get('patients/1') is None
+    response_cache.set('patients/1', entry)
+    assert response_cache.get('patients/1') == entry
+
+    response_cache.clear()
+    assert response_cache.get('patients/1') is None
+
+
+def test_response_cache_invalidate(response_cache):
+    entry = cache.CacheEntry(b'{}', None, None, 1.0)
+    for key in ['patients', 'patients?accessionNumber=giab', 'patients/1', 'patients/1/lab_results', 'patients_x']:
+        response_cache.set(key, entry)
+
+    response_cache.invalidate('patients')
+    assert response_cache.get('patients') is None
+    assert response_cache.get('patients?accessionNumber=giab') is None
+    assert response_cache.get('patients/1') is not None
+
+    response_cache.invalidate('patients', recursive=True)
+    assert response_cache.get('patients/1') is None
+    assert response_cache.get('patients/1/lab_results') is None
+    assert response_cache.get('patients_x') is not None
+
+
+def test_memory_response_cache_maxsize():
+    response_cache = cache.MemoryResponseCache(maxsize=2)
+    entry = cache.CacheEntry(b'{}', None, None, 1.0)
+    response_cache.set('a', entry)
+    response_cache.set('b', entry)
+    response_cache.get('a')
+    response_cache.set('c', entry)
+    assert response_cache.get('a') is not None
+    assert response_cache.get('b') is None
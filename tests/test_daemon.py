@@ -0,0 +1,80 @@
+import os
+import stat
+import threading
+
+import pytest
+from requests.exceptions import HTTPError
+
+from alissa_interpret_client.daemon import RemoteAlissaInterpret, SessionDaemon, is_running
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=10, export_variant_count=500, export_polls=0)
+
+
+@pytest.fixture
+def daemon(tmp_path, create_client):
+    client = create_client()
+    daemon = SessionDaemon(client, str(tmp_path / 'alissa.sock'), 'client_id', 'client_secret', 'username', 'password')
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+def create_remote_client(daemon, username='username', password='password'):
+    return RemoteAlissaInterpret(daemon.socket_path, daemon.client.base_uri, 'client_id', 'client_secret', username, password)
+
+
+def test_session_daemon(daemon):
+    assert stat.S_IMODE(os.stat(daemon.socket_path).st_mode) == 0o600
+    assert is_running(daemon.socket_path)
+
+    remote_client = create_remote_client(daemon)
+    assert remote_client.get_analysis(1)['id'] == 1
+    analyses = remote_client.get_analyses_by_ids([1, 2], analysis_type='PATIENT', return_exceptions=True)
+    assert analyses[0]['id'] == 1
+    assert isinstance(analyses[1], HTTPError) and analyses[1].response.status_code == 404
+
+    # Errors are raised as the exceptions of the client
+    with pytest.raises(HTTPError) as error:
+        remote_client.get_analysis(100)
+    assert error.value.response.status_code == 404
+    with pytest.raises(ValueError, match='Unknown analysis type'):
+        remote_client.get_analyses_by_ids([1], analysis_type='OTHER')
+    with pytest.raises(AttributeError, match='Method not served by daemon'):
+        remote_client.call('_request', 'GET', 'analyses')
+
+    with pytest.raises(PermissionError, match='different username'):
+        create_remote_client(daemon, username='other_username').get_analysis(1)
+    with pytest.raises(PermissionError, match='different credentials'):
+        create_remote_client(daemon, password='wrong_password').get_analysis(1)
+
+
+def test_session_daemon_stream(daemon, server):
+    remote_client = create_remote_client(daemon)
+    analyses = remote_client.iter_analyses(page_size=3)
+    assert not isinstance(analyses, list)
+    assert [analysis['id'] for analysis in analyses] == list(range(1, 11))
+
+    variants = remote_client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+    assert next(variants)['id'] == 0
+    assert remote_client.get_analysis(1)['id'] == 1  # Streams use their own connection
+    assert sum(1 for _ in variants) == 499
+    variants = remote_client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+    next(variants)
+    variants.close()  # Abandoned stream
+
+    # Errors while streaming are raised by the iterator
+    server.malformed_exports.add(1)
+    variants = remote_client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.01, stream=True)
+    with pytest.raises(ValueError):
+        list(variants)
+    assert remote_client.get_analysis(1)['id'] == 1
+
+
+def test_session_daemon_socket_in_use(daemon):
+    with pytest.raises(OSError):
+        SessionDaemon(daemon.client, daemon.socket_path, 'client_id', 'client_secret', 'username', 'password')
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from alissa_interpret_client.exports import ExportTimeoutError
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=20, export_variant_count=100, export_polls=0)
+
+
+def test_completion_order(server, create_client):
+    # Exports are yielded when they are ready, not in the order of the jobs.
+    server.export_polls = {1: 6, 3: 3, 5: 0}
+    client = create_client()
+    jobs = [(1, 'PATIENT', 'molecular_variant'), (3, 'PATIENT', 'molecular_variant'), (5, 'PATIENT', 'molecular_variant')]
+    results = list(client.export_variants_many(
+        jobs, requests_per_second=None, initial_delay=0.01, max_delay=0.01, backoff=1
+    ))
+    assert [result.job.analysis_id for result in results] == [5, 3, 1]
+    assert all(result.error is None and len(result.variants) == 100 for result in results)
+
+    results = list(client.export_variants_many(jobs[:1], requests_per_second=None, initial_delay=0.01, stream=True))
+    assert sum(1 for _ in results[0].variants) == 100
+
+
+def test_max_in_flight(server, create_client):
+    server.export_polls = 2
+    client = create_client()
+    in_flight = []
+    results = []
+    post_variants_export = client.post_variants_export
+
+    def counting_post_variants_export(*args, **kwargs):
+        in_flight.append(len(in_flight) - len(results) + 1)
+        return post_variants_export(*args, **kwargs)
+    client.post_variants_export = counting_post_variants_export
+
+    jobs = [(id, 'PATIENT' if id % 2 else 'INHERITANCE', 'molecular_variant') for id in range(1, 13)]
+    for result in client.export_variants_many(jobs, requests_per_second=None, max_in_flight=4, initial_delay=0.01):
+        assert result.error is None
+        results.append(result)
+    assert len(results) == 12
+    assert max(in_flight) == 4
+
+
+def test_rate_limited_polling(server, create_client):
+    server.export_polls = 2
+    client = create_client()
+    jobs = [(id, 'PATIENT', 'molecular_variant') for id in [1, 3, 5]]
+    start = time.monotonic()
+    results = list(client.export_variants_many(jobs, requests_per_second=20, initial_delay=0.001, max_delay=0.001))
+    elapsed = time.monotonic() - start
+    requests = (
+        server.request_count('POST', 'patient_analyses/{id}/molecular_variants/exports')
+        + server.request_count('GET', 'patient_analyses/{id}/molecular_variants/exports/{id}')
+    )
+    assert len(results) == 3
+    assert requests == 12  # Three exports, each polled three times
+    assert elapsed >= (requests - 1) / 20 * 0.9
+
+
+def test_errors(server, create_client):
+    server.export_polls = {7: 1000}
+    server.malformed_exports.add(3)
+    client = create_client()
+    jobs = [
+        (1, 'PATIENT', 'molecular_variant'), (2, 'OTHER', 'molecular_variant'), (3, 'PATIENT', 'molecular_variant'),
+        (7, 'PATIENT', 'molecular_variant'),
+    ]
+    results = {
+        result.job.analysis_id: result
+        for result in client.export_variants_many(jobs, requests_per_second=None, initial_delay=0.01, timeout=0.3)
+    }
+    assert len(results[1].variants) == 100 and results[1].error is None
+    assert isinstance(results[2].error, ValueError) and results[2].variants is None
+    assert isinstance(results[3].error, ValueError)  # Malformed export
+    assert isinstance(results[7].error, ExportTimeoutError)
+
+
+def test_max_not_found_polls(server, create_client):
+    server.fail_requests('GET', 'patient_analyses/{id}/molecular_variants/exports/{id}', 404, count=4)
+    client = create_client()
+    jobs = [(1, 'PATIENT', 'molecular_variant')]
+    [result] = client.export_variants_many(jobs, requests_per_second=None, initial_delay=0.001, max_not_found_polls=4)
+    assert len(result.variants) == 100 and result.error is None
+
+    server.fail_requests('GET', 'patient_analyses/{id}/molecular_variants/exports/{id}', 404, count=4)
+    [result] = client.export_variants_many(jobs, requests_per_second=None, initial_delay=0.001, max_not_found_polls=3)
+    assert result.error.response.status_code == 404
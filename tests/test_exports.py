@@ -0,0 +1,31 @@
+import pytest
+
+from alissa_interpret_client import exports
+
+
+def test_export_end_point():
+    assert exports.export_end_point('PATIENT', 'molecular_variant', 1) == 'patient_analyses/1/molecular_variants/exports'
+    assert exports.export_end_point('INHERITANCE', 'copy_number_variation', 1, 2) == (
+        'inheritance_analyses/1/copy_number_variations/exports/2'
+    )
+    with pytest.raises(ValueError):
+        exports.export_end_point('UNKNOWN', 'molecular_variant', 1)
+    with pytest.raises(ValueError):
+        exports.export_end_point('PATIENT', 'unknown', 1)
+
+
+def test_poll_schedule():
+    poll_schedule = exports.PollSchedule(initial_delay=1, max_delay=3, backoff=2, timeout=None)
+    assert [poll_schedule.next_delay() for _ in range(4)] == [1, 2, 3, 3]
+    assert poll_schedule.polls == 4
+
+    poll_schedule = exports.PollSchedule(initial_delay=1, timeout=0)
+    with pytest.raises(exports.ExportTimeoutError):
+        poll_schedule.next_delay()
+
+
+def test_poll_schedule_not_found():
+    poll_schedule = exports.PollSchedule(max_not_found_polls=2)
+    assert [poll_schedule.not_found() for _ in range(3)] == [True, True, False]
+    poll_schedule = exports.PollSchedule(max_not_found_polls=None)
+    assert all(poll_schedule.not_found() for _ in range(100))
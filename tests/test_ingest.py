@@ -0,0 +1,98 @@
+import shutil
+
+import pytest
+
+from alissa_interpret_client import ingest
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=0)
+
+
+def test_read_samplesheet(tmp_path):
+    samplesheet = tmp_path / 'samplesheet.tsv'
+    samplesheet.write_text(
+        'accession_number\tfamily_identifier\tgender\tfolder_name\tvcf_file\tsample\n'
+        'giab\tfamily\tFemale\tfolder\tgiab.vcf.gz\tNA12878\n'
+    )
+    assert ingest.read_samplesheet(str(samplesheet)) == [{
+        'accession_number': 'giab', 'family_identifier': 'family', 'gender': 'Female', 'folder_name': 'folder',
+        'comments': '', 'vcf_file': 'giab.vcf.gz', 'vcf_path': str(tmp_path / 'giab.vcf.gz'), 'sample': 'NA12878'
+    }]
+
+    samplesheet.write_text('accession_number\tvcf_file\ngiab\tgiab.vcf.gz\n')
+    with pytest.raises(ValueError):
+        ingest.read_samplesheet(str(samplesheet))
+
+
+def test_ingest_journal(tmp_path):
+    path = str(tmp_path / 'journal')
+    journal = ingest.IngestJournal(path)
+    journal.record(step='patient', accession_number='giab', id=1)
+    journal.record(step='data_file', vcf_file='giab.vcf.gz', id=2)
+    journal.record(step='lab_result', accession_number='giab', vcf_file='giab.vcf.gz', sample='NA12878', id=3)
+    journal.close()
+
+    journal = ingest.IngestJournal(path)
+    assert journal.patients == {'giab': 1}
+    assert journal.data_files == {'giab.vcf.gz': 2}
+    assert journal.lab_results == {('giab', 'giab.vcf.gz', 'NA12878'): 3}
+    journal.close()
+
+
+def test_ingest_pipeline(server, tmp_path, create_client):
+    client = create_client()
+    client.post_patient('existing', 'family1', 'Female', 'folder', '')
+
+    run_dir = tmp_path / 'run'
+    run_dir.mkdir()
+    (run_dir / 'family1.vcf').write_text('##fileformat=VCFv4.2\n')
+    samplesheet = run_dir / 'samplesheet.tsv'
+    samplesheet.write_text(
+        'accession_number\tfamily_identifier\tgender\tfolder_name\tvcf_file\tsample\n'
+        'existing\tfamily1\tFemale\tfolder\tfamily1.vcf\tsample1\n'
+        'new\tfamily1\tMale\tfolder\tfamily1.vcf\tsample2\n'
+        'missing_vcf\tfamily2\tMale\tfolder\tfamily2.vcf\tsample3\n'
+    )
+    journal_file = str(run_dir / 'samplesheet.tsv.journal')
+
+    # The vcf file of family2 is missing, its upload and lab result fail
+    summary = ingest.IngestPipeline(client, journal_file, workers=4).run(ingest.read_samplesheet(str(samplesheet)))
+    assert summary['patients_existing'] == 1
+    assert summary['patients_created'] == 2
+    assert summary['data_files_uploaded'] == 1  # Shared by two samples
+    assert summary['lab_results_created'] == 2
+    assert [(error['step'], error['key']) for error in summary['errors']] == [('data_file', 'family2.vcf')]
+    assert len(server.data_files) == 1
+
+    # Resume after moving the run directory, only the failed steps are done
+    moved_dir = tmp_path / 'moved'
+    shutil.move(str(run_dir), str(moved_dir))
+    (moved_dir / 'family2.vcf').write_text('##fileformat=VCFv4.2\n')
+    samples = ingest.read_samplesheet(str(moved_dir / 'samplesheet.tsv'))
+    summary = ingest.IngestPipeline(client, str(moved_dir / 'samplesheet.tsv.journal')).run(samples)
+    assert summary == {
+        'patients_existing': 0, 'patients_created': 0, 'data_files_uploaded': 1, 'lab_results_created': 1, 'errors': []
+    }
+    assert len(server.patients) == 3
+    assert len(server.data_files) == 2
+    assert sorted(lab_result['sampleIdentifier'] for lab_result in server.lab_results) == ['sample1', 'sample2', 'sample3']
+
+
+def test_ingest_pipeline_malformed_response(tmp_path, create_client):
+    client = create_client()
+    vcf_file = tmp_path / 'family1.vcf'
+    vcf_file.write_text('##fileformat=VCFv4.2\n')
+    samples = [
+        {'accession_number': accession_number, 'family_identifier': 'family1', 'gender': 'Female', 'folder_name': 'folder',
+         'comments': '', 'vcf_file': str(vcf_file), 'sample': accession_number}
+        for accession_number in ['patient1', 'patient2']
+    ]
+    post_patient = client.post_patient
+    client.post_patient = lambda accession_number, *args: (
+        {} if accession_number == 'patient1' else post_patient(accession_number, *args)
+    )
+    summary = ingest.IngestPipeline(client, str(tmp_path / 'journal')).run(samples)
+    assert [(error['step'], error['key']) for error in summary['errors']] == [('patient', 'patient1')]
+    assert summary['lab_results_created'] == 1
@@ -0,0 +1,11 @@
+import pytest
+
+from alissa_interpret_client import jsonlib
+
+
+def test_get_backend():
+    assert jsonlib.get_backend().name in jsonlib.BACKENDS
+    backend = jsonlib.get_backend('json')
+    assert backend.loads(b'[{"id": 1, "labels": "N,Benign"}]') == [{'id': 1, 'labels': 'N,Benign'}]
+    with pytest.raises(ValueError):
+        jsonlib.get_backend('simplejson')
@@ -0,0 +1,39 @@
+from alissa_interpret_client import labels
+
+
+def variant(variant_labels):
+    return {'classificationTreeLabelsScore': {'labels': variant_labels}}
+
+
+def test_label_counter():
+    variants = [
+        variant('Y,Manual review'),
+        variant('Y2,Manual review;Y,manual review'),
+        variant('Y3 (rare),Manual review'),
+        variant('N,Benign'),
+        {'classificationTreeLabelsScore': None},
+        {},
+    ]
+    label_counter = labels.LabelCounter()
+    assert label_counter.count(variants) == [2, 1, 1]
+    assert label_counter.count(iter(variants)) == [2, 1, 1]
+    assert label_counter.count_dict(variants) == {
+        'y,manual review': 2, 'y2,manual review': 1, 'y3 (rare),manual review': 1
+    }
+
+
+def test_label_counter_case_sensitive():
+    label_counter = labels.LabelCounter(['Y,Manual review'], case_sensitive=True)
+    assert label_counter.count([variant('Y,Manual review'), variant('y,manual review')]) == [1]
+
+
+def test_label_counter_nested_labels():
+    # Labels occurring within another label are counted like str.count
+    label_counter = labels.LabelCounter(['y,manual review', 'xy,manual review'])
+    assert label_counter.count([variant('xy,manual review'), variant('y,manual review')]) == [2, 1]
+
+
+def test_label_counter_batches():
+    label_counter = labels.LabelCounter(batch_size=2)
+    assert label_counter.count([variant('Y,Manual review')] * 5) == [5, 0, 0]
+    assert label_counter.count([]) == [0, 0, 0]
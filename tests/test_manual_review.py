@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import pytest
+
+from alissa_interpret_client.manual_review import (
+    COLUMNS, ManualReviewStore, ManualReviewSync, one_year_before, variant_count
+)
+
+
+@pytest.fixture
+def server_options():
+    return dict(analysis_count=20, export_variant_count=60, export_polls=0)
+
+
+def test_manual_review_sync(server, tmp_path, create_client):
+    client = create_client()
+    store = ManualReviewStore(str(tmp_path / 'manual_review.sqlite'))
+    progress = []
+
+    # Analyses 5, 10, 15 and 20 are completed
+    summary = ManualReviewSync(client, store, workers=4, initial_delay=0.01).run(progress=lambda *args: progress.append(args))
+    assert summary == {'analyses_checked': 16, 'analyses_exported': 16, 'errors': []}
+    assert [done for done, total, eta, reference in progress] == list(range(1, 17))
+    assert len(store.references()) == 16
+    analysis = store.get('P000001')
+    assert analysis['molecular_variant_count'] == 60
+    assert [analysis['manual_review_count_Y'], analysis['manual_review_count_Y2'], analysis['manual_review_count_Y3']] == [
+        10, 10, 10
+    ]
+    assert analysis['CNV_manual_review_count_Y'] == 0
+
+    # Incremental run only exports changed analyses
+    server.analyses[0]['lastUpdatedOn'] = '2099-01-01T00:00:00.000+0000'
+    server.analyses[1]['status'] = 'COMPLETED'
+    server.analyses[1]['lastUpdatedOn'] = '2099-01-01T00:00:01.000+0000'
+    summary = ManualReviewSync(client, store, initial_delay=0.01).run()
+    assert summary == {'analyses_checked': 1, 'analyses_exported': 1, 'errors': []}
+    assert store.get('P000001')['last_updated_on'] == '2099-01-01T00:00:00.000+0000'
+    assert store.get('I000002') is None
+    assert store.get_state('high_water_mark') == '2099-01-01T00:00:01.000+0000'
+
+    # Export to and import from tab separated files
+    tsv_file = str(tmp_path / 'manual_review.tsv')
+    store.export_tsv(tsv_file)
+    store.close()
+    with open(tsv_file) as tsv:
+        assert tsv.readline().rstrip('\n').split('\t') == COLUMNS
+    store = ManualReviewStore(str(tmp_path / 'imported.sqlite'))
+    assert store.import_tsv(tsv_file) == 15
+    store.close()
+
+
+def test_manual_review_sync_errors(server, tmp_path, create_client):
+    client = create_client()
+    store = ManualReviewStore(str(tmp_path / 'manual_review.sqlite'))
+    server.export_latency = 10
+    summary = ManualReviewSync(client, store, full=True, export_timeout=0.01).run()
+    assert summary['analyses_exported'] == 0
+    assert len(summary['errors']) == 16
+    assert store.get_state('high_water_mark') is None  # Failed analyses are retried in the next run
+    store.close()
+
+
+def test_manual_review_sync_malformed_export(server, tmp_path, create_client):
+    client = create_client()
+    store = ManualReviewStore(str(tmp_path / 'manual_review.sqlite'))
+    server.malformed_exports.update([1, 2])
+    summary = ManualReviewSync(client, store, initial_delay=0.01).run()
+    assert summary['analyses_exported'] == 14
+    assert sorted(error['analysis_reference'] for error in summary['errors']) == ['I000002', 'P000001']
+    assert len(store.references()) == 14  # Other analyses are stored
+    assert store.get_state('high_water_mark') is None
+    store.close()
+
+
+def test_manual_review_sync_not_found_polls(server, tmp_path, create_client):
+    # Exports reported as not found for longer than max_not_found_polls fail the analysis
+    client = create_client()
+    store = ManualReviewStore(str(tmp_path / 'manual_review.sqlite'))
+    for analysis_type in ['patient', 'inheritance']:
+        server.fail_requests('GET', f'{analysis_type}_analyses/{{id}}/molecular_variants/exports/{{id}}', 404, count=4)
+    summary = ManualReviewSync(client, store, workers=1, initial_delay=0.001, max_not_found_polls=4).run()
+    assert summary['analyses_exported'] == 16 and not summary['errors']
+    store.close()
+
+
+def test_variant_count():
+    assert variant_count({'labResults': [
+        {'analysisVariantCount': {'molecularVariantCount': 10}},
+        {'analysisVariantCount': {'molecularVariantCount': None}},
+        {'analysisVariantCount': None},
+        {},
+    ]}, 'molecularVariantCount') == 10
+    assert variant_count({'labResults': None}, 'molecularVariantCount') == 0
+
+
+def test_one_year_before():
+    assert one_year_before(datetime(2024, 3, 1, 12, 30)) == datetime(2023, 3, 1, 12, 30)
+    assert one_year_before(datetime(2024, 2, 29, 12, 30)) == datetime(2023, 2, 28, 12, 30)
@@ -0,0 +1,88 @@
+from alissa_interpret_client import metrics
+
+
+def test_end_point_template():
+    assert metrics.end_point_template('analyses') == 'analyses'
+    assert metrics.end_point_template('analyses/12') == 'analyses/{id}'
+    assert metrics.end_point_template(
+        'patient_analyses/12/molecular_variants/exports/3f2b8c1e-6a4d-4f7a-9c1e-2b3d4e5f6a7b'
+    ) == 'patient_analyses/{id}/molecular_variants/exports/{id}'
+
+
+def test_metrics_summary():
+    spans = []
+    request_metrics = metrics.Metrics(buckets=(0.1, 1), span_hook=spans.append)
+    request_metrics.record_request('GET', 'analyses/1', 200, 1000.0, 0.05, 0, 100)
+    request_metrics.record_request('GET', 'analyses/2', 503, 1000.0, 0.5, 0, 10)
+    request_metrics.record_request('GET', 'analyses/2', None, 1000.0, 2)
+    request_metrics.record_retry('GET', 'analyses/2', 503)
+    request_metrics.record_poll('analyses/2/export', False)
+    request_metrics.record_poll('analyses/2/export', True)
+    request_metrics.record_token('password', 1000.0, 0.2)
+
+    summary = request_metrics.summary()
+    assert summary['requests'] == [{
+        'method': 'GET', 'end_point': 'analyses/{id}', 'count': 3, 'errors': 2,
+        'statuses': {'200': 1, '503': 1, 'error': 1},
+        'latency': {'count': 3, 'sum': 2.55, 'mean': 0.85, 'max': 2, 'p50': 0.55, 'p95': 2, 'p99': 2},
+        'bytes_sent': 0, 'bytes_received': 110
+    }]
+    assert summary['retries'] == [{'method': 'GET', 'end_point': 'analyses/{id}', 'reason': '503', 'count': 1}]
+    assert summary['export_polls'] == [
+        {'end_point': 'analyses/{id}/export', 'ready': False, 'count': 1},
+        {'end_point': 'analyses/{id}/export', 'ready': True, 'count': 1},
+    ]
+    assert summary['tokens'][0]['grant'] == 'password'
+
+    assert [span.name for span in spans] == ['GET analyses/{id}'] * 3 + ['token']
+    assert spans[0] == metrics.Span(
+        'GET analyses/{id}', 1000.0, 1000.05, {'http.method': 'GET', 'http.route': 'analyses/{id}', 'http.status_code': 200},
+        None
+    )
+    assert [span.error for span in spans] == [None, '503', 'error', None]
+
+    request_metrics.reset()
+    assert request_metrics.summary()['requests'] == []
+
+
+def test_metrics_prometheus():
+    request_metrics = metrics.Metrics(buckets=(0.1, 1))
+    request_metrics.record_request('POST', 'patients', 200, 1000.0, 0.5, 20, 10)
+    lines = request_metrics.prometheus().splitlines()
+    assert 'alissa_interpret_requests_total{method="POST",end_point="patients",status="200"} 1' in lines
+    assert 'alissa_interpret_request_duration_seconds_bucket{method="POST",end_point="patients",le="0.1"} 0' in lines
+    assert 'alissa_interpret_request_duration_seconds_bucket{method="POST",end_point="patients",le="1"} 1' in lines
+    assert 'alissa_interpret_request_duration_seconds_bucket{method="POST",end_point="patients",le="+Inf"} 1' in lines
+    assert 'alissa_interpret_request_duration_seconds_count{method="POST",end_point="patients"} 1' in lines
+    assert 'alissa_interpret_request_bytes_sent_total{method="POST",end_point="patients"} 20' in lines
+    assert 'alissa_interpret_request_bytes_received_total{method="POST",end_point="patients"} 10' in lines
+
+
+def test_client_metrics(server, create_client):
+    spans = []
+    request_metrics = metrics.Metrics(span_hook=spans.append)
+    client = create_client(metrics=request_metrics)
+    assert client.get_analysis(1)['id'] == 1
+    assert len(client.export_variants('PATIENT', 'molecular_variant', 1, initial_delay=0.001)) == 1000
+    server.revoke_tokens()
+    assert client.get_analysis(2)['id'] == 2  # Rejected token is refreshed and the request retried
+
+    summary = request_metrics.summary()
+    requests = {(request['method'], request['end_point']): request for request in summary['requests']}
+    assert requests[('GET', 'analyses/{id}')]['statuses'] == {'200': 2, '401': 1}
+    assert requests[('GET', 'analyses/{id}')]['errors'] == 1
+    assert requests[('GET', 'analyses/{id}')]['bytes_received'] > 0
+    assert requests[('POST', 'patient_analyses/{id}/molecular_variants/exports')]['bytes_sent'] > 0
+    export_end_point = 'patient_analyses/{id}/molecular_variants/exports/{id}'
+    assert requests[('GET', export_end_point)]['statuses'] == {'200': 1, '202': 1}
+    assert summary['retries'] == [{'method': 'GET', 'end_point': 'analyses/{id}', 'reason': '401', 'count': 1}]
+    assert summary['export_polls'] == [
+        {'end_point': export_end_point, 'ready': False, 'count': 1},
+        {'end_point': export_end_point, 'ready': True, 'count': 1},
+    ]
+    assert [wait['end_point'] for wait in summary['export_waits']] == [export_end_point]
+    assert [(token['grant'], token['count']) for token in summary['tokens']] == [('password', 1), ('refresh_token', 1)]
+    assert {span.name for span in spans} >= {'GET analyses/{id}', 'export wait', 'token'}
+    assert f'alissa_interpret_requests_total{{method="GET",end_point="{export_end_point}",status="202"}} 1' in (
+        request_metrics.prometheus().splitlines()
+    )
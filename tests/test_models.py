@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from alissa_interpret_client import models
+from alissa_interpret_client.mock_server import make_analysis, make_variant
+
+
+def test_parse_datetime():
+    expected = datetime(2021, 3, 1, 10, 15, tzinfo=timezone.utc)
+    assert models.parse_datetime('2021-03-01T10:15:00.000+0000') == expected
+    assert models.parse_datetime('2021-03-01T10:15:00+0000') == expected
+    with pytest.raises(ValueError):
+        models.parse_datetime('01-03-2021')
+
+
+def test_analysis():
+    data = dict(make_analysis(3), labResults=[{'analysisVariantCount': {'molecularVariantCount': 10}}])
+    analysis = models.Analysis(data)
+    assert analysis.id == 3
+    assert analysis.analysis_pipeline_name == 'Exome pipeline'
+    assert analysis.last_updated_on - analysis.created_on == timedelta(days=1, seconds=3)
+    assert analysis.created_on is analysis.created_on  # Decoded once
+    assert analysis.lab_results[0].analysis_variant_count.molecular_variant_count == 10
+    assert analysis.lab_results[0].analysis_variant_count.copy_number_variation_count is None
+    assert analysis.lab_results[0].sample_identifier is None
+
+    # Undeclared fields and dict access
+    data['newField'] = 'value'
+    assert analysis.new_field == 'value'
+    with pytest.raises(AttributeError):
+        analysis.missing_field
+    assert analysis['analysisPipelineName'] == 'Exome pipeline'
+    assert analysis.get('missing') is None
+    assert dict(analysis) == data
+    assert analysis == models.Analysis(dict(data)) and analysis == data
+    assert analysis != models.Patient(data)
+    assert repr(analysis) == 'Analysis(id=3)'
+
+
+def test_export_record():
+    record = models.ExportRecord(make_variant(10))
+    assert record.marked_for_review is True
+    assert record.gene_symbol == 'GENE10'
+    assert record.classification_tree_labels_score.score == 3
+    assert record.to_dict() == make_variant(10)
+    with pytest.raises(AttributeError):
+        record.gene = 'GENE1'  # Models are slotted and read-only
+
+
+def test_to_models():
+    assert models.to_models(models.DataFile, {'id': 1}).id == 1
+    assert [data_file.id for data_file in models.to_models(models.DataFile, [{'id': 1}, {'id': 2}])] == [1, 2]
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from alissa_interpret_client import streaming
+
+
+def chunked(data, size):
+    data = data.encode('utf-8')
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024])
+def test_iter_json_array(chunk_size):
+    items = [{'id': 1, 'labels': 'Y,Manual review'}, {'id': 2, 'gene': 'BRCA1 é'}, 123, 'text ]', [1, [2]], None, True]
+    data = json.dumps(items, ensure_ascii=False, indent=1)
+    assert list(streaming.iter_json_array(chunked(data, chunk_size))) == items
+
+
+def test_iter_json_array_empty():
+    assert list(streaming.iter_json_array([b' [ ] '])) == []
+    assert list(streaming.iter_json_array([b'[', b']'])) == []
+
+
+def test_iter_json_array_invalid():
+    with pytest.raises(ValueError):
+        list(streaming.iter_json_array([b'{"error": "not an array"}']))
+    with pytest.raises(ValueError):
+        list(streaming.iter_json_array([b'[{"id": 1}, {"id": 2']))
+    with pytest.raises(ValueError):
+        list(streaming.iter_json_array([b'[1 2]']))
+    with pytest.raises(ValueError):
+        list(streaming.iter_json_array([b'']))
@@ -0,0 +1,48 @@
+import time
+
+from alissa_interpret_client import token_cache
+
+
+def test_token_cache_key():
+    key = token_cache.token_cache_key('https://alissa', 'client', 'user')
+    assert key == token_cache.token_cache_key('https://alissa', 'client', 'user')
+    assert key != token_cache.token_cache_key('https://alissa', 'client', 'other_user')
+    assert 'user' not in key
+
+
+def test_token_is_valid():
+    assert not token_cache.token_is_valid(None)
+    assert not token_cache.token_is_valid({})
+    assert token_cache.token_is_valid({'access_token': 'token'})
+    assert token_cache.token_is_valid({'access_token': 'token', 'expires_at': time.time() + 3600}, margin=60)
+    assert not token_cache.token_is_valid({'access_token': 'token', 'expires_at': time.time() + 30}, margin=60)
+    assert not token_cache.token_is_valid({'access_token': 'token', 'expires_at': time.time() - 1})
+    # Margin is capped at half the token lifetime
+    assert token_cache.token_is_valid(
+        {'access_token': 'token', 'expires_in': 30, 'expires_at': time.time() + 30}, margin=60
+    )
+
+
+def test_memory_token_cache():
+    cache = token_cache.MemoryTokenCache()
+    assert cache.get('key') is None
+    with cache.lock('key'):
+        cache.set('key', {'access_token': 'token'})
+    assert cache.get('key') == {'access_token': 'token'}
+    cache.delete('key')
+    assert cache.get('key') is None
+
+
+def test_file_token_cache(tmp_path):
+    path = tmp_path / 'tokens.json'
+    cache = token_cache.FileTokenCache(str(path))
+    assert cache.get('key') is None
+    with cache.lock('key'):
+        cache.set('key', {'access_token': 'token'})
+    assert token_cache.FileTokenCache(str(path)).get('key') == {'access_token': 'token'}
+    assert path.stat().st_mode & 0o777 == 0o600
+    cache.delete('key')
+    assert cache.get('key') is None
+
+    path.write_text('corrupt')
+    assert cache.get('key') is None
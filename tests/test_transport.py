@@ -0,0 +1,50 @@
+import time
+
+from requests.exceptions import ConnectTimeout, ReadTimeout
+
+from alissa_interpret_client import transport
+
+
+def test_parse_retry_after():
+    assert transport.parse_retry_after(None) is None
+    assert transport.parse_retry_after('') is None
+    assert transport.parse_retry_after('5') == 5
+    assert transport.parse_retry_after('-5') == 0
+    assert transport.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert transport.parse_retry_after('invalid') is None
+
+
+def test_retry_policy_retryable():
+    retry_policy = transport.RetryPolicy()
+    assert retry_policy.is_retryable_status('GET', 502)
+    assert retry_policy.is_retryable_status('GET', 429)
+    assert not retry_policy.is_retryable_status('GET', 404)
+    assert retry_policy.is_retryable_status('POST', 429)
+    assert not retry_policy.is_retryable_status('POST', 502)
+
+    assert retry_policy.is_retryable_error('GET', ReadTimeout())
+    assert retry_policy.is_retryable_error('POST', ConnectTimeout())
+    assert not retry_policy.is_retryable_error('POST', ReadTimeout())
+
+
+def test_retry_policy_backoff():
+    retry_policy = transport.RetryPolicy(backoff_factor=1, max_backoff=5, jitter=0.5)
+    assert 0.5 <= retry_policy.backoff(0) <= 1
+    assert 2 <= retry_policy.backoff(2) <= 4
+    assert 2.5 <= retry_policy.backoff(10) <= 5
+    assert retry_policy.backoff(0, retry_after='3') == 3
+    assert retry_policy.backoff(0, retry_after='60') == 5
+
+
+def test_rate_limiter():
+    rate_limiter = transport.RateLimiter(rate=100)
+    start = time.monotonic()
+    for _ in range(11):
+        rate_limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+    rate_limiter = transport.RateLimiter(rate=None)
+    start = time.monotonic()
+    for _ in range(100):
+        rate_limiter.acquire()
+    assert time.monotonic() - start < 0.05
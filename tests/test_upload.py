@@ -0,0 +1,43 @@
+import email
+
+from alissa_interpret_client import upload
+
+
+def parse_multipart(content_type, body):
+    return email.message_from_bytes(f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + body).get_payload()
+
+
+def test_multipart_file_stream(tmp_path):
+    path = tmp_path / 'test.vcf.gz'
+    data = bytes(range(256)) * 100
+    path.write_bytes(data)
+    progress = []
+
+    with upload.MultipartFileStream(str(path), progress=lambda *args: progress.append(args)) as stream:
+        body = b''
+        chunk = stream.read(1000)
+        while chunk:
+            body += chunk
+            chunk = stream.read(1000)
+        assert len(body) == len(stream)
+        assert stream.tell() == len(stream)
+
+        parts = parse_multipart(stream.content_type, body)
+        assert len(parts) == 1
+        assert parts[0].get_filename() == 'test.vcf.gz'
+        assert parts[0].get_payload(decode=True) == data
+        assert progress[-1][:2] == (len(data), len(data))
+
+        # Rewind and read the complete body at once
+        stream.seek(0)
+        assert stream.read() == body
+
+
+def test_multipart_file_stream_content_type(tmp_path):
+    path = tmp_path / 'test.vcf'
+    path.write_bytes(b'##fileformat=VCFv4.2\n')
+
+    with upload.MultipartFileStream(str(path), content_type='text/plain') as stream:
+        parts = parse_multipart(stream.content_type, stream.read())
+        assert parts[0].get_content_type() == 'text/plain'
+        assert parts[0].get_payload(decode=True) == b'##fileformat=VCFv4.2\n'
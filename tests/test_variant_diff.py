@@ -0,0 +1,37 @@
+from alissa_interpret_client import variant_diff
+
+
+def test_variant_hash():
+    assert variant_diff.variant_hash({'id': 1, 'start': 100}) == variant_diff.variant_hash({'start': 100, 'id': 1})
+    assert variant_diff.variant_hash({'id': 1, 'start': 100}) != variant_diff.variant_hash({'id': 1, 'start': 101})
+
+
+def test_variant_snapshot_store(tmp_path):
+    store = variant_diff.VariantSnapshotStore(str(tmp_path / 'snapshots.sqlite'))
+    export = [{'id': 1, 'labels': 'N,Benign'}, {'id': 2, 'labels': 'N,Benign'}, {'id': 3, 'labels': 'N,Benign'}]
+
+    diff = store.diff('PATIENT', 'molecular_variant', 10, iter(export))
+    assert diff == variant_diff.VariantDiff(export, [], [], 0)
+    assert store.snapshot('PATIENT', 'molecular_variant', 10)[1] == 3
+    assert store.snapshot('PATIENT', 'copy_number_variation', 10) is None
+
+    export = [{'id': 1, 'labels': 'N,Benign'}, {'id': 2, 'labels': 'Y,Manual review'}, {'id': 4, 'labels': 'N,Benign'}]
+    diff = store.diff('PATIENT', 'molecular_variant', 10, iter(export), update=False)
+    assert diff == variant_diff.VariantDiff([export[2]], [export[1]], ['3'], 1)
+    assert store.diff('PATIENT', 'molecular_variant', 10, iter(export)) == diff  # Previous diff did not update the store
+    assert store.diff('PATIENT', 'molecular_variant', 10, iter(export)) == variant_diff.VariantDiff([], [], [], 3)
+
+    # Variants without id are identified by their content
+    diff = store.diff('PATIENT', 'molecular_variant', 11, iter([{'start': 100}]))
+    assert diff.added == [{'start': 100}]
+    diff = store.diff('PATIENT', 'molecular_variant', 11, iter([{'start': 200}]))
+    assert diff.added == [{'start': 200}]
+    assert diff.removed == [variant_diff.variant_hash({'start': 100})]
+
+    # Custom variant key
+    def position(variant):
+        return variant['start']
+    store.diff('PATIENT', 'molecular_variant', 12, iter([{'start': 100, 'labels': 'N,Benign'}]), key=position)
+    diff = store.diff('PATIENT', 'molecular_variant', 12, iter([{'start': 100, 'labels': 'Y,Pathogenic'}]), key=position)
+    assert diff == variant_diff.VariantDiff([], [{'start': 100, 'labels': 'Y,Pathogenic'}], [], 0)
+    store.close()
@@ -0,0 +1,70 @@
+from array import array
+
+from alissa_interpret_client import variants
+from alissa_interpret_client.mock_server import make_variant
+from alissa_interpret_client.models import ExportRecord
+
+
+def test_get_field():
+    variant = {'chromosome': '1', 'classificationTreeLabelsScore': {'labels': 'Y,Manual review'}}
+    assert variants.get_field(variant, 'chromosome') == '1'
+    assert variants.get_field(variant, 'classificationTreeLabelsScore.labels') == 'Y,Manual review'
+    assert variants.get_field(variant, 'classificationTreeLabelsScore.score') is None
+    assert variants.get_field(variant, 'chromosome.labels') is None
+
+
+def test_variant_table():
+    export = [
+        {'chromosome': '1', 'start': 100, 'gene': 'GENE1', 'classificationTreeLabelsScore': {'labels': 'Y,Manual review'}},
+        {'chromosome': '1', 'start': 200, 'gene': 'GENE2', 'classificationTreeLabelsScore': {'labels': 'N,Benign'}},
+        {'chromosome': 'X', 'start': 300, 'gene': 'GENE1', 'classificationTreeLabelsScore': None},
+    ]
+    fields = ['chromosome', 'start', 'gene', 'classificationTreeLabelsScore.labels']
+    table = variants.VariantTable.from_variants(iter(export), fields)
+
+    assert len(table) == 3
+    assert isinstance(table['start'], array)
+    assert table['gene'][0] is table['gene'][2]  # Repeated strings are stored once
+    assert list(table)[0] == {
+        'chromosome': '1', 'start': 100, 'gene': 'GENE1', 'classificationTreeLabelsScore.labels': 'Y,Manual review'
+    }
+
+    assert list(table.where('chromosome', '1')['start']) == [100, 200]
+    assert list(table.where_in('gene', ['GENE2', 'GENE3'])['start']) == [200]
+    assert list(table.contains('classificationTreeLabelsScore.labels', 'manual review')['start']) == [100]
+    assert list(table.filter(lambda variant: variant['start'] > 150)['gene']) == ['GENE2', 'GENE1']
+    assert len(table.where('chromosome', 'Y')) == 0
+
+
+def test_variant_table_mixed_types():
+    table = variants.VariantTable.from_variants(
+        [{'value': 1}, {'value': None}, {'value': [1, 2]}, {'value': {'depth': None, 'pass': True}}], ['value']
+    )
+    assert table['value'] == [1, None, '[1, 2]', '{"depth": null, "pass": true}']
+
+
+def test_variant_filter():
+    export = [
+        {'id': 1, 'chromosome': '1', 'geneSymbol': 'BRCA1', 'classificationTreeLabelsScore': {'labels': 'Y,Manual review'}},
+        {'id': 2, 'chromosome': '1', 'geneSymbol': 'TP53', 'classificationTreeLabelsScore': {'labels': 'N,Benign'}},
+        {'id': 3, 'chromosome': 'X', 'geneSymbol': 'BRCA2', 'classificationTreeLabelsScore': None},
+    ]
+    assert [variant['id'] for variant in filter(variants.variant_filter({'chromosome': '1'}), export)] == [1, 2]
+    assert [variant['id'] for variant in filter(variants.variant_filter({
+        'geneSymbol': ['BRCA1', 'BRCA2'], 'chromosome': 'X'
+    }), export)] == [3]
+    assert [variant['id'] for variant in filter(variants.variant_filter({
+        'classificationTreeLabelsScore.labels': lambda labels: 'manual review' in (labels or '').lower()
+    }), export)] == [1]
+
+
+def test_export_records():
+    records = [ExportRecord(make_variant(index)) for index in range(20)]
+    assert variants.get_field(records[10], 'classificationTreeLabelsScore.score') == 3
+    assert variants.get_field(records[10], 'chromosome') == '11'
+
+    predicate = variants.variant_filter({'markedForReview': True, 'classificationTreeLabelsScore.score': [3, 5]})
+    assert [record.id for record in records if predicate(record)] == [10]
+
+    table = variants.VariantTable.from_variants(records, ['id', 'classificationTreeLabelsScore.score'])
+    assert list(table['classificationTreeLabelsScore.score']) == [index % 7 for index in range(20)]